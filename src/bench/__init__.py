@@ -0,0 +1,19 @@
+from ._bridge import FakeBridge
+from ._harness import Benchmark, percentiles, run
+from ._memory import MemoryBenchmark
+from ._replay import Replay
+from ._source import SyntheticSource, SyntheticScanner, advertisement, ibeacon_advertisement, eddystone_advertisement
+
+__all__ = [
+    "Benchmark",
+    "FakeBridge",
+    "MemoryBenchmark",
+    "Replay",
+    "SyntheticSource",
+    "SyntheticScanner",
+    "advertisement",
+    "ibeacon_advertisement",
+    "eddystone_advertisement",
+    "percentiles",
+    "run"
+]
@@ -0,0 +1,72 @@
+import argparse
+import json
+import sys
+
+import bench
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m bench',
+                                     description="End-to-end Elessar benchmarks against fake Hue bridges.")
+    parser.add_argument('--verbose', action='store_true')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    synthetic = subparsers.add_parser('synthetic', help="run with synthetic BLE traffic")
+    synthetic.add_argument('--duration', type=float, default=30, help="seconds of synthetic traffic")
+    synthetic.add_argument('--scan-period', type=int, default=3, help="BeaconManager scan period in seconds")
+    synthetic.add_argument('--devices', type=int, default=100, help="number of unrelated BLE devices")
+    synthetic.add_argument('--rate', type=float, default=200, help="unrelated advertisements per second")
+    synthetic.add_argument('--beacons', type=int, default=1, help="number of configured beacons")
+    synthetic.add_argument('--period', type=float, default=10,
+                           help="seconds between two appearances of the configured beacons")
+    synthetic.add_argument('--bridges', type=int, default=1, help="number of fake bridges")
+    synthetic.add_argument('--groups', type=int, default=1, help="number of groups per bridge")
+    synthetic.add_argument('--latency', type=float, default=0.02, help="bridge response latency in seconds")
+    synthetic.add_argument('--jitter', type=float, default=0, help="maximum random latency added in seconds")
+    synthetic.add_argument('--loss', type=float, default=0, help="probability a bridge request is never answered")
+    synthetic.add_argument('--throttle', type=int, default=None, help="bridge requests per second before 503")
+    synthetic.add_argument('--seed', type=int, default=0)
+
+    replay = subparsers.add_parser('replay', help="replay an advertisement capture")
+    replay.add_argument('capture', help="capture file recorded by the application")
+    replay.add_argument('configuration', help="configuration providing beacons, scan period and bridge groups")
+    replay.add_argument('--speed', type=float, default=100, help="replay speed relative to real time")
+    replay.add_argument('--latency', type=float, default=0, help="bridge response latency in seconds")
+
+    memory = subparsers.add_parser('memory', help="measure memory with many surrounding devices")
+    memory.add_argument('--devices', type=int, default=10000, help="number of random BLE devices")
+    memory.add_argument('--rate', type=float, default=5000, help="advertisements per second")
+    memory.add_argument('--rotation', type=float, default=1,
+                        help="probability an advertisement comes from a new random address")
+    memory.add_argument('--scan-period', type=int, default=2, help="BeaconManager scan period in seconds")
+    memory.add_argument('--periods', type=int, default=10, help="number of scan periods to measure")
+    memory.add_argument('--warmup', type=int, default=3,
+                        help="minimum scan periods before memory must stay flat, longer until it levels off")
+    memory.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args()
+
+    if args.command == 'replay':
+        benchmark = bench.Replay(args.capture, args.configuration, speed=args.speed, latency=args.latency)
+    elif args.command == 'memory':
+        benchmark = bench.MemoryBenchmark(device_count=args.devices, rate=args.rate, rotation=args.rotation,
+                                          scan_period=args.scan_period, periods=args.periods,
+                                          warmup_periods=args.warmup, seed=args.seed)
+    else:
+        benchmark = bench.Benchmark(duration=args.duration,
+                                    scan_period=args.scan_period,
+                                    device_count=args.devices,
+                                    rate=args.rate,
+                                    beacon_count=args.beacons,
+                                    period=args.period,
+                                    bridge_count=args.bridges,
+                                    group_count=args.groups,
+                                    latency=args.latency,
+                                    jitter=args.jitter,
+                                    loss=args.loss,
+                                    throttle=args.throttle,
+                                    seed=args.seed)
+    result = bench.run(benchmark, verbose=args.verbose)
+    print(json.dumps(result, indent=4))
+    # Memory growth beyond the tolerance fails the run.
+    if not result.get('passed', True):
+        sys.exit(1)
@@ -0,0 +1,170 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Optional
+
+from aiohttp import web
+
+
+class FakeBridge:
+    __USERNAME = 'bench'
+
+    __id: str
+    __name: str
+    __groups: dict[str, dict[str, any]]
+    __random: random.Random
+    __loop: Optional[asyncio.AbstractEventLoop]
+    __thread: Optional[threading.Thread]
+    __runner: Optional[web.AppRunner]
+    __started: threading.Event
+    __throttle_window: float
+    __throttle_count: int
+
+    latency: float
+    jitter: float
+    loss: float
+    throttle: Optional[int]
+    paired: bool
+    port: Optional[int]
+    requests: list[tuple[float, str, str, int]]
+    group_actions: list[tuple[float, str, bool]]
+
+    def __init__(self, bridge_id: str, name: str = None, group_count: int = 1, latency: float = 0, jitter: float = 0,
+                 loss: float = 0, throttle: int = None, paired: bool = True, seed: int = 0,
+                 group_ids: list[str] = None):
+        self.__id = bridge_id
+        self.__name = name or f"Fake bridge {bridge_id}"
+        if group_ids is None:
+            group_ids = [str(index) for index in range(1, group_count + 1)]
+        self.__groups = {group_id: {'name': f"Group {group_id}", 'action': {'on': False}} for group_id in group_ids}
+        self.__random = random.Random(seed)
+        self.__loop = None
+        self.__thread = None
+        self.__runner = None
+        self.__started = threading.Event()
+        self.__throttle_window = 0
+        self.__throttle_count = 0
+
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.throttle = throttle
+        self.paired = paired
+        self.port = None
+        self.requests = []
+        self.group_actions = []
+
+    @property
+    def id(self) -> str:
+        return self.__id
+
+    @property
+    def username(self) -> str:
+        return self.__USERNAME
+
+    @property
+    def group_ids(self) -> list[str]:
+        return list(self.__groups.keys())
+
+    @property
+    def address(self) -> str:
+        return f"127.0.0.1:{self.port}"
+
+    def __throttled(self, now: float) -> bool:
+        if not self.throttle:
+            return False
+        if now - self.__throttle_window >= 1:
+            self.__throttle_window = now
+            self.__throttle_count = 0
+        self.__throttle_count += 1
+        return self.__throttle_count > self.throttle
+
+    @web.middleware
+    async def __middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        received = time.perf_counter()
+        status = 0
+        try:
+            if self.__throttled(received):
+                status = 503
+                raise web.HTTPServiceUnavailable()
+            if self.__random.random() < self.loss:
+                # Never answer, the client times out.
+                await asyncio.sleep(3600)
+            delay = self.latency + self.__random.uniform(0, self.jitter)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            response = await handler(request)
+            status = response.status
+            return response
+        finally:
+            self.requests.append((received, request.method, request.path, status))
+
+    def __check_username(self, request: web.Request) -> Optional[web.Response]:
+        if request.match_info['username'] != self.__USERNAME:
+            return web.json_response([{'error': {'type': 1, 'address': request.path,
+                                                 'description': 'unauthorized user'}}])
+
+    async def __get_public_config(self, request: web.Request) -> web.Response:
+        return web.json_response({'name': self.__name, 'bridgeid': self.__id})
+
+    async def __register_app(self, request: web.Request) -> web.Response:
+        if not self.paired:
+            return web.json_response([{'error': {'type': 101, 'address': '',
+                                                 'description': 'link button not pressed'}}])
+        return web.json_response([{'success': {'username': self.__USERNAME}}])
+
+    async def __get_config(self, request: web.Request) -> web.Response:
+        return self.__check_username(request) or web.json_response({'name': self.__name, 'bridgeid': self.__id,
+                                                                     'whitelist': {self.__USERNAME: {}}})
+
+    async def __get_groups(self, request: web.Request) -> web.Response:
+        return self.__check_username(request) or web.json_response(self.__groups)
+
+    async def __set_group_action(self, request: web.Request) -> web.Response:
+        error = self.__check_username(request)
+        if error:
+            return error
+        group_id = request.match_info['group_id']
+        if group_id not in self.__groups:
+            return web.json_response([{'error': {'type': 3, 'address': request.path,
+                                                 'description': 'resource not available'}}])
+        data = await request.json()
+        self.__groups[group_id]['action'].update(data)
+        if 'on' in data:
+            self.group_actions.append((time.perf_counter(), group_id, bool(data['on'])))
+        return web.json_response([{'success': {f"/groups/{group_id}/action/{key}": value}}
+                                  for key, value in data.items()])
+
+    async def __serve(self):
+        app = web.Application(middlewares=[self.__middleware])
+        app.router.add_get('/api/config', self.__get_public_config)
+        app.router.add_post('/api', self.__register_app)
+        app.router.add_get('/api/{username}/config', self.__get_config)
+        app.router.add_get('/api/{username}/groups', self.__get_groups)
+        app.router.add_put('/api/{username}/groups/{group_id}/action', self.__set_group_action)
+
+        self.__runner = web.AppRunner(app, access_log=None)
+        await self.__runner.setup()
+        site = web.TCPSite(self.__runner, '127.0.0.1', self.port or 0, shutdown_timeout=0.1)
+        await site.start()
+        self.port = self.__runner.addresses[0][1]
+        self.__started.set()
+
+    def __run(self):
+        asyncio.set_event_loop(self.__loop)
+        self.__loop.run_until_complete(self.__serve())
+        self.__loop.run_forever()
+        self.__loop.run_until_complete(self.__runner.cleanup())
+        self.__loop.close()
+
+    def start(self):
+        # The bridge runs its own loop in a thread so its CPU time is not accounted to the application.
+        self.__loop = asyncio.new_event_loop()
+        self.__thread = threading.Thread(target=self.__run, name=f"bridge-{self.__id}", daemon=True)
+        self.__thread.start()
+        self.__started.wait()
+
+    def stop(self):
+        self.__loop.call_soon_threadsafe(self.__loop.stop)
+        self.__thread.join()
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from collections import Counter
+
+import elessar
+import hue
+from ._bridge import FakeBridge
+from ._source import SyntheticSource, SyntheticScanner, ibeacon_advertisement
+
+
+def percentiles(values: list[float], points: tuple[int, ...] = (50, 90, 99)) -> dict[str, float]:
+    if not values:
+        return {}
+    values = sorted(values)
+    result = {f"p{point}": values[min(len(values) - 1, max(0, round(point / 100 * len(values)) - 1))]
+              for point in points}
+    result['max'] = values[-1]
+    return result
+
+
+class Benchmark:
+    __BEACON_UUID = uuid.UUID('e2c56db5-dffb-48d2-b060-d0f5a71096e0')
+
+    duration: float
+    scan_period: int
+    device_count: int
+    rate: float
+    beacon_count: int
+    period: float
+    bridge_count: int
+    group_count: int
+    latency: float
+    jitter: float
+    loss: float
+    throttle: int
+    seed: int
+
+    def __init__(self, duration: float = 30, scan_period: int = 3, device_count: int = 100, rate: float = 200,
+                 beacon_count: int = 1, period: float = 10, bridge_count: int = 1, group_count: int = 1,
+                 latency: float = 0.02, jitter: float = 0, loss: float = 0, throttle: int = None, seed: int = 0):
+        self.duration = duration
+        self.scan_period = scan_period
+        self.device_count = device_count
+        self.rate = rate
+        self.beacon_count = beacon_count
+        self.period = period
+        self.bridge_count = bridge_count
+        self.group_count = group_count
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.throttle = throttle
+        self.seed = seed
+
+    def __write_configuration(self, path: str, bridges: list[FakeBridge]):
+        data = {
+            'scan_period': self.scan_period,
+            'force_lights_state': False,
+            'beacons': [{'_vendor': 'ibeacon', 'uuid': str(self.__BEACON_UUID), 'major': '1', 'minor': str(minor)}
+                        for minor in range(self.beacon_count)],
+            'bridges': [{'id': bridge.id, 'name': None, 'group_ids': bridge.group_ids, 'username': bridge.username}
+                        for bridge in bridges]
+        }
+        with open(path, 'w') as file:
+            json.dump(data, file)
+
+    @staticmethod
+    def __transition_latencies(transitions: list[tuple[float, bool]], bridges: list[FakeBridge],
+                               end: float) -> list[float]:
+        latencies = []
+        bounds = [timestamp for timestamp, _ in transitions[1:]] + [end]
+        for (start, value), stop in zip(transitions, bounds):
+            acknowledged = [timestamp for bridge in bridges for timestamp, _, on in bridge.group_actions
+                            if on == value and start <= timestamp < stop]
+            expected = sum(len(bridge.group_ids) for bridge in bridges)
+            if len(acknowledged) >= expected:
+                latencies.append(max(acknowledged) - start)
+        return latencies
+
+    async def run(self) -> dict[str, any]:
+        bridges = [FakeBridge(f"fake{index:04x}", group_count=self.group_count, latency=self.latency,
+                              jitter=self.jitter, loss=self.loss, throttle=self.throttle, seed=self.seed + index)
+                   for index in range(self.bridge_count)]
+        for bridge in bridges:
+            bridge.start()
+
+        source = SyntheticSource(self.device_count, self.rate,
+                                 [ibeacon_advertisement(self.__BEACON_UUID, 1, minor)
+                                  for minor in range(self.beacon_count)],
+                                 period=self.period, seed=self.seed)
+        bridge_manager = hue.BridgeManager(hue.BridgeClientSession(scheme='http'),
+                                           {bridge.id: bridge.address for bridge in bridges})
+
+        with tempfile.TemporaryDirectory() as directory:
+            configuration_path = os.path.join(directory, 'elessar.json')
+            self.__write_configuration(configuration_path, bridges)
+            app = elessar.Elessar(configuration_path, lambda callback: SyntheticScanner(source, callback),
+                                  bridge_manager)
+
+            await app.startup()
+            cpu_start = time.thread_time()
+            wall_start = time.perf_counter()
+            await source.run(self.duration)
+            traffic_end = time.perf_counter()
+            # Leave time for the last transition to be noticed and applied.
+            await asyncio.sleep(self.scan_period + 1)
+            cpu = time.thread_time() - cpu_start
+            wall_end = time.perf_counter()
+            await app.shutdown()
+
+        for bridge in bridges:
+            bridge.stop()
+
+        requests = [request for bridge in bridges for request in bridge.requests]
+        endpoints = Counter(f"{method} {path.replace(bridges[0].username, '<username>')}"
+                            for bridge in bridges for _, method, path, _ in bridge.requests)
+        statuses = Counter(status for _, _, _, status in requests)
+        transitions = len(source.transitions)
+        latencies = self.__transition_latencies(source.transitions, bridges, wall_end)
+
+        return {
+            'duration': wall_end - wall_start,
+            'advertisements': source.advertisements,
+            'advertisements_per_second': source.advertisements / (traffic_end - wall_start),
+            'cpu_seconds': cpu,
+            'cpu_microseconds_per_advertisement': cpu / source.advertisements * 1e6 if source.advertisements else None,
+            'transitions': transitions,
+            'applied_transitions': len(latencies),
+            'latency': percentiles(latencies),
+            'requests': len(requests),
+            'requests_per_transition': len(requests) / transitions if transitions else None,
+            'requests_by_endpoint': dict(endpoints),
+            'requests_by_status': {str(status): count for status, count in statuses.items()},
+        }
+
+
+def run(benchmark, verbose: bool = False) -> dict[str, any]:
+    logging.basicConfig(level=logging.DEBUG if verbose else logging.CRITICAL)
+    return asyncio.run(benchmark.run())
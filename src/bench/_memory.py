@@ -0,0 +1,108 @@
+import asyncio
+import tracemalloc
+import uuid
+
+import ble
+import ble.vendors
+from ._source import SyntheticSource, SyntheticScanner, ibeacon_advertisement
+
+
+class MemoryBenchmark:
+    __BEACON_UUID = uuid.UUID('e2c56db5-dffb-48d2-b060-d0f5a71096e0')
+    # Allowed growth between successive thirds of the measurement, relative to the first one. The warmup ends after
+    # consecutive scan periods not exceeding the previous peak by more than that.
+    __TOLERANCE = 0.05
+    __STEADY_PERIODS = 2
+    __PARTS = 3
+    # Scanners hold the devices discovered since the start of the scan, each period is measured at its lowest.
+    __SAMPLES_PER_PERIOD = 4
+
+    device_count: int
+    rate: float
+    rotation: float
+    scan_period: int
+    periods: int
+    warmup_periods: int
+    seed: int
+
+    # Devices keep rotating their address: bounded structures level off once full, whatever the parameters, an
+    # unbounded one keeps growing. The warmup lasts until memory levels off, at most for as many periods as measured.
+    def __init__(self, device_count: int = 10000, rate: float = 5000, rotation: float = 1, scan_period: int = 2,
+                 periods: int = 10, warmup_periods: int = 3, seed: int = 0):
+        self.device_count = device_count
+        self.rate = rate
+        self.rotation = rotation
+        self.scan_period = scan_period
+        self.periods = periods
+        self.warmup_periods = warmup_periods
+        self.seed = seed
+
+    async def __run_scenario(self, filtered: bool) -> dict[str, any]:
+        beacon_types = [
+            ble.vendors.iBeacon,
+            ble.vendors.AltBeacon,
+            ble.vendors.Eddystone,
+            ble.vendors.EddystoneURL,
+            ble.vendors.EddystoneEID,
+            ble.vendors.EddystoneTLM
+        ]
+        patterns = ble.advertisement_patterns(beacon_types) if filtered else None
+        source = SyntheticSource(self.device_count, self.rate, [ibeacon_advertisement(self.__BEACON_UUID, 1, 0)],
+                                 seed=self.seed, rotation=self.rotation)
+        manager = ble.BeaconManager(lambda: None, beacon_types,
+                                    lambda callback: SyntheticScanner(source, callback, patterns))
+        manager.scan_period = self.scan_period
+
+        periods = max(self.periods, self.__PARTS)
+        max_warmup_periods = self.warmup_periods + periods
+        tracemalloc.start()
+        manager_task = asyncio.ensure_future(manager.start())
+        source_task = asyncio.ensure_future(source.run(self.scan_period * (max_warmup_periods + periods) + 1))
+        samples = []
+        steady_periods = 0
+        warmup_periods = None
+        while warmup_periods is None or len(samples) < warmup_periods + periods:
+            period_samples = []
+            for _ in range(self.__SAMPLES_PER_PERIOD):
+                await asyncio.sleep(self.scan_period / self.__SAMPLES_PER_PERIOD)
+                period_samples.append(tracemalloc.get_traced_memory()[0])
+            sample = min(period_samples)
+            steady_periods = steady_periods + 1 if samples and sample <= max(samples) * (1 + self.__TOLERANCE) else 0
+            samples.append(sample)
+            if warmup_periods is None and len(samples) >= self.warmup_periods and \
+                    (steady_periods >= self.__STEADY_PERIODS or len(samples) >= max_warmup_periods):
+                warmup_periods = len(samples)
+        source.stop()
+        manager.stop()
+        await asyncio.gather(manager_task, source_task)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        # Parts are averaged, beacons appearing and expiring make single periods noisy. A structure resizing once
+        # raises a single part, one that is unbounded raises all of them.
+        measured = samples[warmup_periods:]
+        means = [sum(part) / len(part) for part in (measured[len(measured) * index // self.__PARTS:
+                                                             len(measured) * (index + 1) // self.__PARTS]
+                                                    for index in range(self.__PARTS))]
+        baseline = means[0]
+        growth = min(second - first for first, second in zip(means, means[1:]))
+        return {
+            'advertisements': source.advertisements,
+            'available_beacons': len(manager.available_beacons),
+            'warmup_periods': warmup_periods,
+            'memory_kib_by_period': [round(sample / 1024) for sample in samples],
+            'peak_kib': round(peak / 1024),
+            'growth_kib': round(growth / 1024),
+            'flat': growth <= baseline * self.__TOLERANCE
+        }
+
+    async def run(self) -> dict[str, any]:
+        filtered = await self.__run_scenario(True)
+        unfiltered = await self.__run_scenario(False)
+        return {
+            'devices': self.device_count,
+            'rotation': self.rotation,
+            'filtered': filtered,
+            'unfiltered': unfiltered,
+            'passed': filtered['flat'] and unfiltered['flat']
+        }
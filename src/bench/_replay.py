@@ -0,0 +1,89 @@
+import datetime
+import json
+import os
+import tempfile
+import time
+
+import ble
+import elessar
+import hue
+from ._bridge import FakeBridge
+
+
+class Replay:
+    capture_path: str
+    configuration_path: str
+    speed: float
+    latency: float
+
+    def __init__(self, capture_path: str, configuration_path: str, speed: float = 100, latency: float = 0):
+        self.capture_path = capture_path
+        self.configuration_path = configuration_path
+        self.speed = speed
+        self.latency = latency
+
+    async def run(self) -> dict[str, any]:
+        with open(self.configuration_path, 'r') as file:
+            configuration = json.load(file)
+
+        # Configured bridges are replaced by fake bridges exposing the same groups.
+        bridges = [FakeBridge(bridge_state['id'], bridge_state.get('name'), latency=self.latency,
+                              group_ids=bridge_state.get('group_ids', []))
+                   for bridge_state in configuration.get('bridges', [])]
+        for bridge in bridges:
+            bridge.start()
+        configuration['bridges'] = [{'id': bridge.id, 'name': None, 'group_ids': bridge.group_ids,
+                                     'username': bridge.username} for bridge in bridges]
+        configuration['force_lights_state'] = False
+        bridge_manager = hue.BridgeManager(hue.BridgeClientSession(scheme='http'),
+                                           {bridge.id: bridge.address for bridge in bridges})
+
+        with ble.CaptureReader(self.capture_path) as reader, tempfile.TemporaryDirectory() as directory:
+            first = next(iter(reader), None)
+            if first is None:
+                raise ble.InvalidCaptureError(self.capture_path)
+            origin = first[0]
+            scan_period = int(configuration.get('scan_period', 3))
+
+            configuration_path = os.path.join(directory, 'elessar.json')
+            with open(configuration_path, 'w') as file:
+                json.dump(configuration, file)
+
+            scanners = []
+
+            def scanner_factory(callback: callable) -> ble.ReplayScanner:
+                scanners.append(ble.ReplayScanner(reader, clock, callback))
+                return scanners[-1]
+
+            clock = ble.ScaledClock(origin, self.speed)
+            app = elessar.Elessar(configuration_path, scanner_factory, bridge_manager, clock)
+
+            await app.startup()
+            cpu_start = time.thread_time()
+            wall_start = time.perf_counter()
+            await scanners[0].wait()
+            capture_end = clock.time()
+            # Leave time for the last scan period to complete and its lights to be applied.
+            await clock.sleep(scan_period + 1)
+            cpu = time.thread_time() - cpu_start
+            wall = time.perf_counter() - wall_start
+            await app.shutdown()
+
+        for bridge in bridges:
+            bridge.stop()
+
+        advertisements = scanners[0].advertisements
+        actions = sorted((clock.to_time(timestamp), bridge.id, group_id, on)
+                         for bridge in bridges for timestamp, group_id, on in bridge.group_actions)
+        return {
+            'capture_start': datetime.datetime.fromtimestamp(origin).isoformat(),
+            'capture_end': datetime.datetime.fromtimestamp(capture_end).isoformat(),
+            'speed': self.speed,
+            'wall_seconds': wall,
+            'advertisements': advertisements,
+            'cpu_seconds': cpu,
+            'cpu_microseconds_per_advertisement': cpu / advertisements * 1e6 if advertisements else None,
+            'requests': sum(len(bridge.requests) for bridge in bridges),
+            'light_actions': [{'time': datetime.datetime.fromtimestamp(timestamp).isoformat(), 'bridge': bridge_id,
+                               'group': group_id, 'on': on} for timestamp, bridge_id, group_id, on in actions]
+        }
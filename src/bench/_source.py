@@ -0,0 +1,179 @@
+import asyncio
+import random
+import time
+import uuid
+from typing import Optional
+
+import bleak
+
+import ble.vendors
+from ble.vendors._frames import Common
+
+
+def advertisement(local_name: Optional[str] = None, manufacturer_data: dict[int, bytes] = None,
+                  service_data: dict[str, bytes] = None, rssi: int = -60) -> bleak.AdvertisementData:
+    return bleak.AdvertisementData(local_name=local_name,
+                                   manufacturer_data=manufacturer_data or {},
+                                   service_data=service_data or {},
+                                   service_uuids=list(service_data or {}),
+                                   tx_power=None,
+                                   rssi=rssi,
+                                   platform_data=())
+
+
+def ibeacon_advertisement(beacon_uuid: uuid.UUID, major: int, minor: int, rssi: int = -60) -> bleak.AdvertisementData:
+    data = bytes([0x02, 0x15]) + beacon_uuid.bytes + major.to_bytes(2, 'big') + minor.to_bytes(2, 'big') + b'\xc5'
+    return advertisement(manufacturer_data={Common.APPLE_CID: data}, rssi=rssi)
+
+
+def eddystone_advertisement(namespace: bytes, instance: bytes, rssi: int = -60) -> bleak.AdvertisementData:
+    data = bytes([0x00, 0xee]) + namespace + instance + b'\x00\x00'
+    return advertisement(service_data={Common.EDDYSTONE_SVC_UUID: data}, rssi=rssi)
+
+
+class SyntheticScanner:
+    __source: 'SyntheticSource'
+    __callback: callable
+    __patterns: Optional[tuple[tuple[int, int, bytes], ...]]
+    __discovered: dict[str, tuple[bleak.BLEDevice, bleak.AdvertisementData]]
+    __scanning: bool
+
+    def __init__(self, source: 'SyntheticSource', detection_callback: callable,
+                 patterns: tuple[tuple[int, int, bytes], ...] = None):
+        self.__source = source
+        self.__callback = detection_callback
+        self.__patterns = patterns
+        self.__discovered = {}
+        self.__scanning = False
+
+    @property
+    def discovered_devices_and_advertisement_data(self) -> dict[str, tuple[bleak.BLEDevice, bleak.AdvertisementData]]:
+        return self.__discovered
+
+    def detect(self, device: bleak.BLEDevice, advertisement_data: bleak.AdvertisementData):
+        if not self.__scanning:
+            return
+        # Like a BlueZ advertisement monitor, advertisements not matching the patterns never reach the process.
+        if self.__patterns is not None and not ble.vendors.matches_patterns(advertisement_data, self.__patterns):
+            return
+        self.__discovered[device.address] = (device, advertisement_data)
+        self.__callback(device, advertisement_data)
+
+    async def start(self):
+        # Like the BlueZ backend, starting a scan forgets previously discovered devices.
+        self.__discovered = {}
+        self.__scanning = True
+        self.__source.attach(self)
+
+    async def stop(self):
+        self.__scanning = False
+        self.__source.detach(self)
+
+
+class SyntheticSource:
+    __TICK = 0.01
+
+    __scanners: set[SyntheticScanner]
+    __background: list[tuple[bleak.BLEDevice, bleak.AdvertisementData]]
+    __watched: list[tuple[bleak.BLEDevice, bleak.AdvertisementData]]
+    __stop_event: asyncio.Event
+    __random: random.Random
+
+    rate: float
+    rotation: float
+    watched_interval: float
+    period: float
+    advertisements: int
+    transitions: list[tuple[float, bool]]
+
+    def __init__(self, device_count: int, rate: float, watched: list[bleak.AdvertisementData],
+                 watched_interval: float = 0.1, period: float = 10, seed: int = 0, rotation: float = 0):
+        self.__scanners = set()
+        self.__stop_event = asyncio.Event()
+        self.__random = generator = random.Random(seed)
+        self.__background = [self.__random_device(generator, index) for index in range(device_count)]
+        self.__watched = [(bleak.BLEDevice(f"02:00:00:00:{index >> 8:02X}:{index & 0xff:02X}", None), data)
+                          for index, data in enumerate(watched)]
+
+        self.rate = rate
+        # Probability a background device advertises from a new random address, as phones rotate theirs.
+        self.rotation = rotation
+        self.watched_interval = watched_interval
+        self.period = period
+        self.advertisements = 0
+        self.transitions = []
+
+    @staticmethod
+    def __random_address(generator: random.Random) -> str:
+        return ':'.join(f"{generator.randrange(256):02X}" for _ in range(6))
+
+    @staticmethod
+    def __random_device(generator: random.Random, index: int) -> tuple[bleak.BLEDevice, bleak.AdvertisementData]:
+        device = bleak.BLEDevice(SyntheticSource.__random_address(generator), None)
+        rssi = generator.randrange(-100, -40)
+        kind = index % 4
+        if kind == 0:
+            # Unrelated iBeacon.
+            data = ibeacon_advertisement(uuid.UUID(int=generator.getrandbits(128)),
+                                         generator.randrange(65536), generator.randrange(65536), rssi)
+        elif kind == 1:
+            # Unrelated Eddystone UID.
+            data = eddystone_advertisement(generator.randbytes(10), generator.randbytes(6), rssi)
+        else:
+            # Phones, wearables and other manufacturer specific payloads.
+            data = advertisement(manufacturer_data={generator.randrange(65535): generator.randbytes(
+                generator.randrange(4, 27))}, rssi=rssi)
+        return device, data
+
+    def attach(self, scanner: SyntheticScanner):
+        self.__scanners.add(scanner)
+
+    def detach(self, scanner: SyntheticScanner):
+        self.__scanners.discard(scanner)
+
+    def __emit(self, device: bleak.BLEDevice, advertisement_data: bleak.AdvertisementData):
+        self.advertisements += 1
+        for scanner in list(self.__scanners):
+            scanner.detect(device, advertisement_data)
+
+    async def run(self, duration: float):
+        start = last = time.perf_counter()
+        background_index = 0
+        background_credit = 0.0
+        watched_due = start
+        present = None
+
+        while not self.__stop_event.is_set():
+            now = time.perf_counter()
+            elapsed = now - start
+            if elapsed >= duration:
+                break
+
+            # Watched beacons are present during the first half of each period.
+            watched_present = bool(self.__watched) and elapsed % self.period < self.period / 2
+            if watched_present != present:
+                present = watched_present
+                self.transitions.append((now, present))
+                watched_due = now
+
+            if present and now >= watched_due:
+                for device, advertisement_data in self.__watched:
+                    self.__emit(device, advertisement_data)
+                watched_due = now + self.watched_interval
+
+            if self.__background:
+                background_credit += self.rate * (now - last)
+                while background_credit >= 1:
+                    device, advertisement_data = self.__background[background_index]
+                    if self.rotation and self.__random.random() < self.rotation:
+                        device = bleak.BLEDevice(self.__random_address(self.__random), None)
+                        self.__background[background_index] = (device, advertisement_data)
+                    self.__emit(device, advertisement_data)
+                    background_index = (background_index + 1) % len(self.__background)
+                    background_credit -= 1
+
+            last = now
+            await asyncio.sleep(self.__TICK)
+
+    def stop(self):
+        self.__stop_event.set()
@@ -1,10 +1,28 @@
 from ._beacon import Beacon, BeaconManager
-from ._exceptions import UnknownBeaconTypeError, InvalidBeaconStateError, InvalidBeaconIDError
+from ._capture import CaptureReader, CaptureWriter
+from ._clock import Clock, ScaledClock
+from ._exceptions import UnknownBeaconTypeError, InvalidBeaconStateError, InvalidBeaconIDError, InvalidCaptureError
+from ._presence import PresenceTable
+from ._process import ScanProcess
+from ._replay import ReplayScanner
+from ._scanner import FilteredScanner, advertisement_patterns
+from ._unmatched import UnmatchedDevices
 
 __all__ = [
     "Beacon",
     "BeaconManager",
+    "CaptureReader",
+    "CaptureWriter",
+    "Clock",
+    "FilteredScanner",
+    "ScaledClock",
+    "PresenceTable",
+    "ReplayScanner",
+    "ScanProcess",
+    "UnmatchedDevices",
     "UnknownBeaconTypeError",
     "InvalidBeaconStateError",
-    "InvalidBeaconIDError"
+    "InvalidBeaconIDError",
+    "InvalidCaptureError",
+    "advertisement_patterns"
 ]
@@ -1,16 +1,50 @@
 import abc
 import asyncio
+import functools
 import logging
+import time
 import types
-from typing import Optional, Type
+from typing import Callable, Optional, Type
 
 import bleak
 
+import history
+import metrics
+import tracing
+from ._capture import CaptureWriter
+from ._clock import Clock
 from ._exceptions import UnknownBeaconTypeError
+from ._presence import PresenceTable
+from ._process import ScanProcess
+from ._scanner import FilteredScanner, advertisement_patterns
+from ._unmatched import UnmatchedDevices
 
 
 class Common:
     STATE_VENDOR_KEY = '_vendor'
+    DRAIN_INTERVAL = 0.05
+
+
+class Metrics:
+    ADVERTISEMENTS = metrics.Counter('elessar_ble_advertisements_total', "Advertisements received from the scanner.",
+                                     ('site',))
+    SCAN_CYCLE_DURATION = metrics.Histogram('elessar_ble_scan_cycle_duration_seconds',
+                                            "Duration of a complete scan cycle.", ('site',),
+                                            buckets=(.5, 1, 2, 3, 5, 10, 20, 30, 60, 120))
+    PARSE_DURATION = metrics.Histogram('elessar_ble_parse_duration_seconds',
+                                       "Time spent matching an advertisement against a beacon vendor.",
+                                       ('site', 'vendor'),
+                                       buckets=(1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 1e-3))
+    MATCHES = metrics.Counter('elessar_ble_matches_total', "Advertisements matched by a beacon vendor.",
+                              ('site', 'vendor'))
+    PARSE_ERRORS = metrics.Counter('elessar_ble_parse_errors_total',
+                                   "Advertisements a beacon vendor failed to parse.", ('site', 'vendor'))
+    AVAILABLE_BEACONS = metrics.Gauge('elessar_ble_available_beacons', "Beacons seen during the scan period.",
+                                      ('site',))
+    UNMATCHED_DEVICES = metrics.Gauge('elessar_ble_unmatched_devices',
+                                      "Devices remembered as not being beacons.", ('site',))
+    DROPPED_SIGHTINGS = metrics.Counter('elessar_ble_dropped_sightings_total',
+                                        "Sightings the scan process could not publish to the ring buffer.", ('site',))
 
 
 class Beacon(abc.ABC):
@@ -29,6 +63,11 @@ class Beacon(abc.ABC):
     def from_id(cls, _id: str) -> 'Beacon':
         pass
 
+    # Patterns of the advertisements the vendor matches, None when they cannot be filtered by the scanner.
+    @classmethod
+    def patterns(cls) -> Optional[tuple[tuple[int, int, bytes], ...]]:
+        return None
+
     @property
     def id(self) -> str:
         return self.vendor() + ':' + self._get_id()
@@ -68,53 +107,211 @@ class Beacon(abc.ABC):
 class BeaconManager:
     __logger: logging.Logger
     __stop_event: asyncio.Event
-    __scanner: bleak.BleakScanner
+    __scanner: Optional[bleak.BleakScanner]
+    __scan_process: Optional[ScanProcess]
+    __advertisements: int
+    __dropped: int
+    __clock: Clock
     __beacon_types: dict[str, Type[Beacon]]
+    __beacon_parsers: list[tuple[Type[Beacon], metrics.HistogramChild, metrics.CounterChild, metrics.CounterChild]]
+    __advertisements_counter: metrics.CounterChild
+    __scan_cycle_duration: metrics.HistogramChild
+    __available_beacons_gauge: metrics.GaugeChild
+    __dropped_sightings_counter: metrics.CounterChild
+    __unmatched_devices_gauge: metrics.GaugeChild
+    __unmatched: UnmatchedDevices
     __callback: callable
-    __available_beacons: dict[str, Beacon]
+    __presence: PresenceTable
+    __scan_period: int
 
-    scan_period: int
     beacons: dict[str, Beacon]
+    capture: Optional[CaptureWriter]
+    history: Optional[history.SightingHistory]
+    needs_refresh: Optional[Callable[[], bool]]
 
-    def __init__(self, callback: callable, beacon_types: list[Type[Beacon]]):
+    def __init__(self, callback: callable, beacon_types: list[Type[Beacon]],
+                 scanner_factory: Callable[[callable], bleak.BleakScanner] = None, clock: Clock = None,
+                 scan_process: bool = False, site: str = '', adapter: str = None):
         self.__logger = logging.getLogger(__name__)
         self.__stop_event = asyncio.Event()
-        self.__scanner = bleak.BleakScanner(self.__scan_callback)
+        self.__clock = clock or Clock()
         self.__beacon_types = {beacon_type.vendor(): beacon_type for beacon_type in beacon_types}
+        # Advertisements of other devices are filtered out by the backend when every vendor provides patterns.
+        scanner_factory = scanner_factory or functools.partial(FilteredScanner,
+                                                               patterns=advertisement_patterns(beacon_types),
+                                                               adapter=adapter)
+        # In a scan process, the scanner is created by the worker and the factory must be picklable.
+        if scan_process:
+            self.__scanner = None
+            self.__scan_process = ScanProcess(beacon_types, self.from_state, scanner_factory)
+        else:
+            self.__scanner = scanner_factory(self.__scan_callback)
+            self.__scan_process = None
+        self.__advertisements = 0
+        self.__dropped = 0
+        # Metric children are resolved once to keep label lookups out of the advertisement path.
+        self.__beacon_parsers = [(beacon_type,
+                                  Metrics.PARSE_DURATION.labels(site, vendor),
+                                  Metrics.MATCHES.labels(site, vendor),
+                                  Metrics.PARSE_ERRORS.labels(site, vendor))
+                                 for vendor, beacon_type in self.__beacon_types.items()]
+        self.__advertisements_counter = Metrics.ADVERTISEMENTS.labels(site)
+        self.__scan_cycle_duration = Metrics.SCAN_CYCLE_DURATION.labels(site)
+        self.__available_beacons_gauge = Metrics.AVAILABLE_BEACONS.labels(site)
+        self.__dropped_sightings_counter = Metrics.DROPPED_SIGHTINGS.labels(site)
+        self.__unmatched_devices_gauge = Metrics.UNMATCHED_DEVICES.labels(site)
+        self.__unmatched = UnmatchedDevices()
         self.__callback = callback
 
-        self.scan_period = 3
+        self.__scan_period = 3
+        self.__presence = PresenceTable(self.__scan_period)
+
         self.beacons = {}
-        self.__available_beacons = {}
+        self.capture = None
+        self.history = None
+        self.needs_refresh = None
+
+    def __see(self, beacon: Beacon, now: float) -> bool:
+        if beacon.id in self.beacons:
+            self.beacons[beacon.id] = beacon
 
-    def __process_discovered_device(self, device: bleak.BLEDevice, advertisement_data: bleak.AdvertisementData) -> bool:
-        added = False
+        self.__logger.debug("Processed beacon '%s'", beacon.name)
+        if not self.__presence.see(beacon, now):
+            return False
 
-        for beacon_type in self.__beacon_types.values():
+        self.__available_beacons_gauge.set(len(self.__presence.beacons))
+        return True
+
+    def __process_discovered_device(self, device: bleak.BLEDevice,
+                                    advertisement_data: bleak.AdvertisementData) -> Optional[Beacon]:
+        added = None
+        matched = False
+        now = self.__clock.time()
+
+        for beacon_type, parse_duration, matches, parse_errors in self.__beacon_parsers:
+            start = time.perf_counter()
             try:
                 beacon = beacon_type.match(device, advertisement_data)
+                parse_duration.observe(time.perf_counter() - start)
                 if beacon:
-                    if beacon.id not in self.__available_beacons:
-                        added = True
+                    matched = True
+                    matches.inc()
+                    if self.__see(beacon, now):
+                        added = beacon
+            except Exception as e:
+                parse_errors.inc()
+                self.__logger.warning(e if e.args else type(e))
 
-                    self.__available_beacons[beacon.id] = beacon
+        if not matched:
+            self.__unmatched.add(device, advertisement_data)
+        return added
 
-                    if beacon.id in self.beacons:
-                        self.beacons[beacon.id] = beacon
+    def __record_history(self, beacon: Beacon, event: int, last_seen: float = None, rssi: int = None):
+        # Only configured beacons are recorded, sightings of any other device would wear out the storage.
+        if not self.history or beacon.id not in self.beacons:
+            return
+        try:
+            self.history.record(self.__clock.time(), beacon.id, event, last_seen, rssi)
+        except Exception as e:
+            self.__logger.warning(e if e.args else type(e))
+
+    def __checkpoint_history(self):
+        now = self.__clock.time()
+        if not self.history or not self.history.checkpoint_due(now):
+            return
+        try:
+            self.history.checkpoint(now, {beacon_id: self.__presence.last_seen(beacon_id)
+                                          for beacon_id in self.__presence.beacons if beacon_id in self.beacons})
+        except Exception as e:
+            self.__logger.warning(e if e.args else type(e))
+
+    def __close_history(self):
+        if self.history:
+            self.history.flush()
+            self.history.close()
+
+    def __appeared(self, beacon: Beacon, received: float, rssi: Optional[int]):
+        self.__record_history(beacon, history.Event.APPEARED, self.__presence.last_seen(beacon.id), rssi)
+        # The callback only runs when has_active_beacon changes: other devices' beacons and configured beacons
+        # appearing next to another one leave it unchanged.
+        available_beacons = self.__presence.beacons
+        if beacon.id not in self.beacons or any(beacon_id != beacon.id and beacon_id in available_beacons
+                                                for beacon_id in self.beacons):
+            return
+
+        with tracing.trace('presence', trigger='advertisement') as trace:
+            trace.add_span('sighting', received, time.perf_counter(), beacon=beacon.id, rssi=rssi)
+            self.__callback()
 
-                    self.__logger.debug("Processed beacon '%s'", beacon.name)
+    def __scan_callback(self, device: bleak.BLEDevice, advertisement_data: bleak.AdvertisementData):
+        received = time.perf_counter()
+        self.__advertisements_counter.inc()
+        if self.capture:
+            try:
+                self.capture.write(self.__clock.time(), device, advertisement_data)
             except Exception as e:
                 self.__logger.warning(e if e.args else type(e))
 
-        return added
+        # Other devices keep advertising the same data, it is only parsed again when it changes.
+        if self.__unmatched.known(device, advertisement_data):
+            return
+
+        beacon = self.__process_discovered_device(device, advertisement_data)
+        if beacon:
+            self.__appeared(beacon, received, advertisement_data.rssi)
+
+    def __drain_sightings(self):
+        # The scan process counts advertisements and drops, only the increments are added to the metrics.
+        advertisements, dropped = self.__scan_process.advertisements, self.__scan_process.dropped
+        self.__advertisements_counter.inc(max(advertisements - self.__advertisements, 0))
+        self.__dropped_sightings_counter.inc(max(dropped - self.__dropped, 0))
+        self.__advertisements, self.__dropped = advertisements, dropped
+
+        for timestamp, received, rssi, beacon in self.__scan_process.drain():
+            # Performance counters share the system monotonic clock, sightings are traced from the worker.
+            if self.__see(beacon, timestamp):
+                self.__appeared(beacon, received, rssi)
+
+    def __expire_beacons(self):
+        expired = self.__presence.expire(self.__clock.time())
+        if not expired:
+            return
+
+        for beacon, last_seen in expired:
+            self.__record_history(beacon, history.Event.DISAPPEARED, last_seen)
+        self.__available_beacons_gauge.set(len(self.__presence.beacons))
+
+        expired_ids = [beacon.id for beacon, _ in expired if beacon.id in self.beacons]
+        if not expired_ids or self.has_active_beacon:
+            return
+
+        with tracing.trace('presence', trigger='expiry') as trace:
+            trace.mark('expiry', beacons=expired_ids)
+            self.__callback()
 
-    def __scan_callback(self, device: bleak.BLEDevice, advertisement_data: bleak.AdvertisementData):
-        if self.__process_discovered_device(device, advertisement_data):
+    def __refresh(self):
+        # Presence is notified on edges, the callback runs again every period while its last result needs it.
+        if not self.needs_refresh or not self.needs_refresh():
+            return
+
+        with tracing.trace('presence', trigger='scan_period'):
             self.__callback()
 
+    @property
+    def scan_period(self) -> int:
+        return self.__scan_period
+
+    @scan_period.setter
+    def scan_period(self, value: int):
+        # Beacons are available until they have not been seen for a whole scan period.
+        self.__scan_period = value
+        self.__presence.ttl = value
+        if self.__scan_process:
+            self.__scan_process.scan_period = value
+
     @property
     def available_beacons(self) -> types.MappingProxyType[str, Beacon]:
-        return types.MappingProxyType(self.__available_beacons)
+        return self.__presence.beacons
 
     @property
     def has_active_beacon(self) -> bool:
@@ -134,15 +331,57 @@ class BeaconManager:
 
         return self.__beacon_types[state[Common.STATE_VENDOR_KEY]].__setstate__(state)
 
+    async def __run_scan_process(self):
+        if self.capture:
+            self.__logger.warning("Advertisements are not captured when scanning in a separate process")
+        self.__scan_process.scan_period = self.__scan_period
+        self.__scan_process.start()
+        refresh_time = self.__clock.time() + self.__scan_period
+
+        while not self.__stop_event.is_set():
+            await self.__clock.sleep(Common.DRAIN_INTERVAL)
+            self.__scan_process.supervise()
+            self.__drain_sightings()
+            self.__expire_beacons()
+            self.__checkpoint_history()
+
+            if self.__clock.time() >= refresh_time:
+                self.__refresh()
+                refresh_time = self.__clock.time() + self.__scan_period
+
+        await self.__scan_process.stop()
+        self.__close_history()
+
     async def start(self):
+        if self.__scan_process:
+            await self.__run_scan_process()
+            return
+
+        start = time.perf_counter()
+        await self.__scanner.start()
+        restart_time = self.__clock.time() + self.__scan_period
+
         while not self.__stop_event.is_set():
-            await self.__scanner.start()
-            await asyncio.sleep(self.scan_period)
-            self.__available_beacons = {}
-            for device, advertisement_data in self.__scanner.discovered_devices_and_advertisement_data.values():
-                self.__process_discovered_device(device, advertisement_data)
-            await self.__scanner.stop()
-            self.__callback()
+            await self.__clock.sleep(self.__presence.resolution)
+            self.__expire_beacons()
+            self.__checkpoint_history()
+
+            if self.__clock.time() >= restart_time:
+                # Restarting the scanner drops the devices the backend accumulated during the period.
+                await self.__scanner.stop()
+                await self.__scanner.start()
+                if self.capture:
+                    self.capture.flush()
+                self.__unmatched_devices_gauge.set(len(self.__unmatched))
+                self.__scan_cycle_duration.observe(time.perf_counter() - start)
+                self.__refresh()
+                start = time.perf_counter()
+                restart_time = self.__clock.time() + self.__scan_period
+
+        await self.__scanner.stop()
+        if self.capture:
+            self.capture.close()
+        self.__close_history()
 
     def stop(self):
         self.__stop_event.set()
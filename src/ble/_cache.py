@@ -0,0 +1,25 @@
+from typing import Callable, Generic, Hashable, TypeVar
+
+T = TypeVar('T')
+
+
+# Beacons advertise the same frame over and over: what is derived from a frame is computed once and reused. The cache
+# is cleared when full, a lookup stays a single dictionary access.
+class BoundedCache(Generic[T]):
+    __entries: dict[Hashable, T]
+    __max_entries: int
+
+    def __init__(self, max_entries: int = 1024):
+        self.__entries = {}
+        self.__max_entries = max_entries
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def get(self, key: Hashable, factory: Callable[[], T]) -> T:
+        value = self.__entries.get(key)
+        if value is None:
+            if len(self.__entries) >= self.__max_entries:
+                self.__entries.clear()
+            value = self.__entries[key] = factory()
+        return value
@@ -0,0 +1,199 @@
+import mmap
+import os
+import struct
+from typing import Iterator, Optional
+from uuid import UUID
+
+import bleak
+
+from ._exceptions import InvalidCaptureError
+
+
+class Common:
+    FILE_HEADER = struct.Struct('<8sH')
+    MAGIC = b'ELESSARC'
+    VERSION = 1
+    # Record size, timestamp, RSSI, TX power, address length, local name length, service UUID count,
+    # manufacturer data count, service data count.
+    RECORD_HEADER = struct.Struct('<HdbbBBBBB')
+    MANUFACTURER_DATA_HEADER = struct.Struct('<HB')
+    SERVICE_DATA_HEADER = struct.Struct('<16sB')
+    NO_TX_POWER = -128
+    MAC_ADDRESS_LENGTH = 6
+
+
+class CaptureWriter:
+    __path: str
+    __max_size: Optional[int]
+    __file: Optional[object]
+    __size: int
+
+    def __init__(self, path: str, max_size: int = None):
+        self.__path = path
+        self.__max_size = max_size
+        self.__file = None
+        self.__size = 0
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    def __open(self):
+        self.__file = open(self.__path, 'ab')
+        self.__size = self.__file.tell()
+        if self.__size == 0:
+            self.__file.write(Common.FILE_HEADER.pack(Common.MAGIC, Common.VERSION))
+            self.__size = Common.FILE_HEADER.size
+
+    def __rotate(self):
+        self.__file.close()
+        os.replace(self.__path, self.__path + '.1')
+        self.__open()
+
+    @staticmethod
+    def __encode_address(address: str) -> bytes:
+        try:
+            packed = bytes.fromhex(address.replace(':', ''))
+            if len(packed) == Common.MAC_ADDRESS_LENGTH:
+                return packed
+        except ValueError:
+            pass
+        return address.encode('utf-8')[:255]
+
+    def write(self, timestamp: float, device: bleak.BLEDevice, advertisement_data: bleak.AdvertisementData):
+        if not self.__file:
+            self.__open()
+
+        address = self.__encode_address(device.address)
+        name = (advertisement_data.local_name or '').encode('utf-8')[:255]
+        service_uuids = advertisement_data.service_uuids[:255]
+        manufacturer_data = list(advertisement_data.manufacturer_data.items())[:255]
+        service_data = list(advertisement_data.service_data.items())[:255]
+        tx_power = advertisement_data.tx_power
+        if tx_power is None or not -127 <= tx_power <= 127:
+            tx_power = Common.NO_TX_POWER
+
+        parts = [b'', address, name]
+        parts.extend(UUID(service_uuid).bytes for service_uuid in service_uuids)
+        for company_id, data in manufacturer_data:
+            data = bytes(data[:255])
+            parts.append(Common.MANUFACTURER_DATA_HEADER.pack(company_id, len(data)))
+            parts.append(data)
+        for service_uuid, data in service_data:
+            data = bytes(data[:255])
+            parts.append(Common.SERVICE_DATA_HEADER.pack(UUID(service_uuid).bytes, len(data)))
+            parts.append(data)
+
+        size = Common.RECORD_HEADER.size + sum(len(part) for part in parts)
+        if size > 0xffff:
+            return
+        parts[0] = Common.RECORD_HEADER.pack(size, timestamp, max(-128, min(127, advertisement_data.rssi)), tx_power,
+                                             len(address), len(name), len(service_uuids), len(manufacturer_data),
+                                             len(service_data))
+
+        if self.__max_size and self.__size + size > self.__max_size:
+            self.__rotate()
+        self.__file.write(b''.join(parts))
+        self.__size += size
+
+    def flush(self):
+        if self.__file:
+            self.__file.flush()
+
+    def close(self):
+        if self.__file:
+            self.__file.close()
+            self.__file = None
+
+
+class CaptureReader:
+    __path: str
+    __file: Optional[object]
+    __map: Optional[mmap.mmap]
+
+    def __init__(self, path: str):
+        self.__path = path
+        self.__file = None
+        self.__map = None
+
+    def open(self):
+        self.__file = open(self.__path, 'rb')
+        try:
+            self.__map = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version = Common.FILE_HEADER.unpack_from(self.__map, 0)
+        except (ValueError, struct.error):
+            self.close()
+            raise InvalidCaptureError(self.__path)
+        if magic != Common.MAGIC or version != Common.VERSION:
+            self.close()
+            raise InvalidCaptureError(self.__path)
+
+    def close(self):
+        if self.__map:
+            self.__map.close()
+            self.__map = None
+        if self.__file:
+            self.__file.close()
+            self.__file = None
+
+    def __enter__(self) -> 'CaptureReader':
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @staticmethod
+    def __decode_address(address: bytes) -> str:
+        if len(address) == Common.MAC_ADDRESS_LENGTH:
+            return ':'.join(f"{byte:02X}" for byte in address)
+        return address.decode('utf-8')
+
+    def __iter__(self) -> Iterator[tuple[float, bleak.BLEDevice, bleak.AdvertisementData]]:
+        if not self.__map:
+            raise RuntimeError("Capture not opened")
+
+        data = self.__map
+        offset = Common.FILE_HEADER.size
+        end = len(data)
+        while offset + Common.RECORD_HEADER.size <= end:
+            (size, timestamp, rssi, tx_power, address_length, name_length, service_uuid_count,
+             manufacturer_data_count, service_data_count) = Common.RECORD_HEADER.unpack_from(data, offset)
+            if size < Common.RECORD_HEADER.size or offset + size > end:
+                # Truncated record at the end of a capture that was not closed properly.
+                break
+            position = offset + Common.RECORD_HEADER.size
+
+            address = self.__decode_address(data[position:position + address_length])
+            position += address_length
+            name = data[position:position + name_length].decode('utf-8') or None
+            position += name_length
+
+            service_uuids = []
+            for _ in range(service_uuid_count):
+                service_uuids.append(str(UUID(bytes=data[position:position + 16])))
+                position += 16
+
+            manufacturer_data = {}
+            for _ in range(manufacturer_data_count):
+                company_id, length = Common.MANUFACTURER_DATA_HEADER.unpack_from(data, position)
+                position += Common.MANUFACTURER_DATA_HEADER.size
+                manufacturer_data[company_id] = data[position:position + length]
+                position += length
+
+            service_data = {}
+            for _ in range(service_data_count):
+                service_uuid, length = Common.SERVICE_DATA_HEADER.unpack_from(data, position)
+                position += Common.SERVICE_DATA_HEADER.size
+                service_data[str(UUID(bytes=service_uuid))] = data[position:position + length]
+                position += length
+
+            offset += size
+            yield timestamp, bleak.BLEDevice(address, name, rssi=rssi), bleak.AdvertisementData(
+                local_name=name,
+                manufacturer_data=manufacturer_data,
+                service_data=service_data,
+                service_uuids=service_uuids,
+                tx_power=None if tx_power == Common.NO_TX_POWER else tx_power,
+                rssi=rssi,
+                platform_data=())
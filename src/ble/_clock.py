@@ -0,0 +1,31 @@
+import asyncio
+import time
+
+
+class Clock:
+    def time(self) -> float:
+        return time.time()
+
+    async def sleep(self, delay: float):
+        await asyncio.sleep(delay)
+
+
+class ScaledClock(Clock):
+    __origin: float
+    __start: float
+
+    speed: float
+
+    def __init__(self, origin: float, speed: float = 1):
+        self.__origin = origin
+        self.__start = time.perf_counter()
+        self.speed = speed
+
+    def to_time(self, counter: float) -> float:
+        return self.__origin + (counter - self.__start) * self.speed
+
+    def time(self) -> float:
+        return self.to_time(time.perf_counter())
+
+    async def sleep(self, delay: float):
+        await asyncio.sleep(delay / self.speed)
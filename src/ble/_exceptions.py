@@ -11,3 +11,8 @@ class InvalidBeaconStateError(Exception):
 class InvalidBeaconIDError(Exception):
     def __init__(self):
         super().__init__("Provided beacon ID is invalid")
+
+
+class InvalidCaptureError(Exception):
+    def __init__(self, path: str):
+        super().__init__(f"'{path}' is not a valid advertisement capture")
@@ -0,0 +1,101 @@
+import math
+import types
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ._beacon import Beacon
+
+
+class PresenceTable:
+    __ttl: float
+    __resolution: float
+    __wheel: list[list[str]]
+    __tick: Optional[int]
+    __beacons: dict[str, 'Beacon']
+    __last_seen: dict[str, float]
+
+    def __init__(self, ttl: float, resolution: float = 0.25):
+        self.__resolution = resolution
+        self.__tick = None
+        self.__beacons = {}
+        self.__last_seen = {}
+        self.__ttl = ttl
+        self.__build_wheel()
+
+    def __build_wheel(self):
+        # Any expiry lies less than one rotation ahead of the current tick.
+        self.__wheel = [[] for _ in range(math.ceil(self.__ttl / self.__resolution) + 2)]
+        for beacon_id, last_seen in self.__last_seen.items():
+            self.__schedule(beacon_id, last_seen + self.__ttl)
+
+    def __schedule(self, beacon_id: str, expiry: float):
+        tick = math.floor(expiry / self.__resolution)
+        if self.__tick is not None and tick <= self.__tick:
+            tick = self.__tick + 1
+        self.__wheel[tick % len(self.__wheel)].append(beacon_id)
+
+    @property
+    def ttl(self) -> float:
+        return self.__ttl
+
+    @ttl.setter
+    def ttl(self, value: float):
+        if value == self.__ttl:
+            return
+        self.__ttl = value
+        self.__build_wheel()
+
+    @property
+    def resolution(self) -> float:
+        return self.__resolution
+
+    @property
+    def beacons(self) -> types.MappingProxyType[str, 'Beacon']:
+        return types.MappingProxyType(self.__beacons)
+
+    def last_seen(self, beacon_id: str) -> Optional[float]:
+        return self.__last_seen.get(beacon_id)
+
+    def see(self, beacon: 'Beacon', now: float) -> bool:
+        beacon_id = beacon.id
+        appeared = beacon_id not in self.__last_seen
+        self.__beacons[beacon_id] = beacon
+        self.__last_seen[beacon_id] = now
+        # A refresh only moves the timestamp, the entry is rescheduled lazily when its slot comes up.
+        if appeared:
+            self.__schedule(beacon_id, now + self.__ttl)
+        return appeared
+
+    def expire(self, now: float) -> list[tuple['Beacon', float]]:
+        target = math.floor(now / self.__resolution)
+        if self.__tick is None:
+            self.__tick = target
+            return []
+
+        expired = []
+        size = len(self.__wheel)
+        # After a long pause, one rotation visits every slot.
+        first = max(self.__tick + 1, target - size + 1)
+        self.__tick = target
+        for tick in range(first, target + 1):
+            slot = tick % size
+            bucket = self.__wheel[slot]
+            if not bucket:
+                continue
+            self.__wheel[slot] = []
+            for beacon_id in bucket:
+                last_seen = self.__last_seen.get(beacon_id)
+                if last_seen is None:
+                    continue
+                expiry = last_seen + self.__ttl
+                if expiry <= now:
+                    del self.__last_seen[beacon_id]
+                    expired.append((self.__beacons.pop(beacon_id), last_seen))
+                else:
+                    self.__schedule(beacon_id, expiry)
+        return expired
+
+    def clear(self):
+        self.__beacons.clear()
+        self.__last_seen.clear()
+        self.__build_wheel()
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import time
+from typing import Callable, Optional, Type, TYPE_CHECKING
+
+import bleak
+
+from ._cache import BoundedCache
+from ._ring import SightingRing
+from ._unmatched import UnmatchedDevices
+
+if TYPE_CHECKING:
+    from ._beacon import Beacon
+
+
+class Common:
+    SLOTS = 4096
+    BATCH_SIZE = 512
+    TICK = 0.25
+    STOP_TIMEOUT = 5
+    RESTART_DELAY = 1
+    MAX_RESTART_DELAY = 300
+    # A worker that ran at least this long is restarted right away when it exits.
+    STABLE_RUN = 60
+
+
+class ScanWorker:
+    __logger: logging.Logger
+    __ring: SightingRing
+    __beacon_types: list[Type['Beacon']]
+    __scanner: bleak.BleakScanner
+    __scan_period: multiprocessing.Value
+    __stop_event: multiprocessing.Event
+    __payloads: BoundedCache[bytes]
+    __unmatched: UnmatchedDevices
+    __advertisements: int
+
+    def __init__(self, ring_name: str, beacon_types: list[Type['Beacon']],
+                 scanner_factory: Callable[[callable], bleak.BleakScanner],
+                 scan_period: multiprocessing.Value, stop_event: multiprocessing.Event):
+        self.__logger = logging.getLogger(__name__)
+        self.__ring = SightingRing(ring_name)
+        self.__beacon_types = beacon_types
+        self.__scanner = scanner_factory(self.__scan_callback)
+        self.__scan_period = scan_period
+        self.__stop_event = stop_event
+        self.__payloads = BoundedCache()
+        self.__unmatched = UnmatchedDevices()
+        self.__advertisements = self.__ring.advertisements
+
+    def __payload(self, beacon: 'Beacon') -> bytes:
+        return self.__payloads.get(beacon, lambda: json.dumps(beacon.__getstate__(), separators=(',', ':')).encode())
+
+    def __scan_callback(self, device: bleak.BLEDevice, advertisement_data: bleak.AdvertisementData):
+        received = time.perf_counter()
+        self.__advertisements += 1
+        if self.__unmatched.known(device, advertisement_data):
+            return
+
+        matched = False
+        for beacon_type in self.__beacon_types:
+            try:
+                beacon = beacon_type.match(device, advertisement_data)
+                if beacon:
+                    matched = True
+                    self.__ring.publish(time.time(), received, advertisement_data.rssi, self.__payload(beacon))
+            except Exception as e:
+                self.__logger.warning(e if e.args else type(e))
+
+        if not matched:
+            self.__unmatched.add(device, advertisement_data)
+
+    async def run(self):
+        await self.__scanner.start()
+        restart_time = time.monotonic() + self.__scan_period.value
+
+        while not self.__stop_event.is_set():
+            await asyncio.sleep(Common.TICK)
+            self.__ring.advertisements = self.__advertisements
+
+            if time.monotonic() >= restart_time:
+                await self.__scanner.stop()
+                await self.__scanner.start()
+                restart_time = time.monotonic() + self.__scan_period.value
+
+        await self.__scanner.stop()
+        self.__ring.close()
+
+    @staticmethod
+    def main(*args):
+        asyncio.run(ScanWorker(*args).run())
+
+
+class ScanProcess:
+    # The worker must not inherit the event loop, the D-Bus connection or the sockets of the application.
+    __context = multiprocessing.get_context('spawn')
+
+    __logger: logging.Logger
+    __beacon_types: list[Type['Beacon']]
+    __from_state: Callable[[dict], 'Beacon']
+    __scanner_factory: Callable[[callable], bleak.BleakScanner]
+    __ring: Optional[SightingRing]
+    __process: Optional[multiprocessing.Process]
+    __scan_period: multiprocessing.Value
+    __stop_event: multiprocessing.Event
+    __beacons: BoundedCache['Beacon']
+    __started: float
+    __restart_delay: float
+    __restart_time: Optional[float]
+
+    def __init__(self, beacon_types: list[Type['Beacon']], from_state: Callable[[dict], 'Beacon'],
+                 scanner_factory: Callable[[callable], bleak.BleakScanner]):
+        self.__logger = logging.getLogger(__name__)
+        self.__beacon_types = beacon_types
+        self.__from_state = from_state
+        self.__scanner_factory = scanner_factory
+        self.__ring = None
+        self.__process = None
+        self.__scan_period = self.__context.Value('d', 3, lock=False)
+        self.__stop_event = self.__context.Event()
+        self.__beacons = BoundedCache()
+        self.__started = 0
+        self.__restart_delay = 0
+        self.__restart_time = None
+
+    @property
+    def scan_period(self) -> float:
+        return self.__scan_period.value
+
+    @scan_period.setter
+    def scan_period(self, value: float):
+        self.__scan_period.value = value
+
+    @property
+    def alive(self) -> bool:
+        return self.__process is not None and self.__process.is_alive()
+
+    @property
+    def advertisements(self) -> int:
+        return self.__ring.advertisements if self.__ring else 0
+
+    @property
+    def dropped(self) -> int:
+        return self.__ring.dropped if self.__ring else 0
+
+    def start(self):
+        if self.__ring is None:
+            self.__ring = SightingRing(slots=Common.SLOTS)
+        self.__stop_event.clear()
+        self.__process = self.__context.Process(target=ScanWorker.main, name='elessar-scan', daemon=True,
+                                                args=(self.__ring.name, self.__beacon_types,
+                                                      self.__scanner_factory, self.__scan_period,
+                                                      self.__stop_event))
+        self.__process.start()
+        self.__started = time.monotonic()
+
+    def supervise(self):
+        if self.__process is None or self.__process.is_alive():
+            return
+
+        now = time.monotonic()
+        if self.__restart_time is None:
+            # Workers failing right after they start, e.g. without a Bluetooth adapter, are restarted less and
+            # less often.
+            if now - self.__started >= Common.STABLE_RUN:
+                self.__restart_delay = 0
+            else:
+                self.__restart_delay = min(max(self.__restart_delay * 2, Common.RESTART_DELAY),
+                                           Common.MAX_RESTART_DELAY)
+            self.__restart_time = now + self.__restart_delay
+            self.__logger.warning("Scan process exited with code %s, restarting it in %g seconds",
+                                  self.__process.exitcode, self.__restart_delay)
+
+        if now >= self.__restart_time:
+            self.__restart_time = None
+            self.start()
+
+    async def stop(self):
+        self.__restart_time = None
+        self.__stop_event.set()
+        if self.__process:
+            deadline = time.monotonic() + Common.STOP_TIMEOUT
+            while self.__process.is_alive() and time.monotonic() < deadline:
+                await asyncio.sleep(Common.TICK)
+            if self.__process.is_alive():
+                self.__process.terminate()
+            self.__process.join()
+            self.__process = None
+        if self.__ring:
+            self.__ring.close()
+            self.__ring = None
+
+    def __decode(self, payload: bytes) -> 'Beacon':
+        return self.__beacons.get(payload, lambda: self.__from_state(json.loads(payload)))
+
+    def drain(self) -> list[tuple[float, float, int, 'Beacon']]:
+        if self.__ring is None:
+            return []
+        sightings = []
+        for timestamp, received, rssi, payload in self.__ring.drain(Common.BATCH_SIZE):
+            try:
+                sightings.append((timestamp, received, rssi, self.__decode(payload)))
+            except Exception as e:
+                self.__logger.warning(e if e.args else type(e))
+        return sightings
@@ -0,0 +1,68 @@
+import asyncio
+from typing import Optional
+
+import bleak
+
+from ._capture import CaptureReader
+from ._clock import Clock
+
+
+class ReplayScanner:
+    # Records less than this far in the future are replayed without yielding to the loop.
+    __SLEEP_THRESHOLD = 0.001
+
+    __reader: CaptureReader
+    __clock: Clock
+    __callback: callable
+    __discovered: dict[str, tuple[bleak.BLEDevice, bleak.AdvertisementData]]
+    __scanning: bool
+    __task: Optional[asyncio.Task]
+    __finished: asyncio.Event
+
+    advertisements: int
+
+    def __init__(self, reader: CaptureReader, clock: Clock, detection_callback: callable):
+        self.__reader = reader
+        self.__clock = clock
+        self.__callback = detection_callback
+        self.__discovered = {}
+        self.__scanning = False
+        self.__task = None
+        self.__finished = asyncio.Event()
+
+        self.advertisements = 0
+
+    @property
+    def discovered_devices_and_advertisement_data(self) -> dict[str, tuple[bleak.BLEDevice, bleak.AdvertisementData]]:
+        return self.__discovered
+
+    async def __replay(self):
+        try:
+            for timestamp, device, advertisement_data in self.__reader:
+                delay = timestamp - self.__clock.time()
+                if delay > self.__SLEEP_THRESHOLD:
+                    await self.__clock.sleep(delay)
+                # Advertisements received while the scanner is stopped are lost, as they would be on air.
+                if not self.__scanning:
+                    continue
+                self.advertisements += 1
+                self.__discovered[device.address] = (device, advertisement_data)
+                self.__callback(device, advertisement_data)
+        finally:
+            self.__finished.set()
+
+    async def wait(self):
+        await self.__finished.wait()
+
+    async def start(self):
+        self.__discovered = {}
+        self.__scanning = True
+        if not self.__task:
+            self.__task = asyncio.ensure_future(self.__replay())
+
+    async def stop(self):
+        self.__scanning = False
+
+    def cancel(self):
+        if self.__task:
+            self.__task.cancel()
@@ -0,0 +1,91 @@
+import struct
+from multiprocessing import shared_memory
+from typing import Optional
+
+
+class Common:
+    COUNTER = struct.Struct('<Q')
+    # Each counter has a cache line of its own, the producer and the consumer never write the same one.
+    HEAD_OFFSET = 0
+    TAIL_OFFSET = 64
+    ADVERTISEMENTS_OFFSET = 128
+    DROPPED_OFFSET = 192
+    SLOTS_OFFSET = 256
+    # Sequence number, timestamp, performance counter, RSSI, payload size.
+    SLOT_HEADER = struct.Struct('<QddbH')
+    SLOT_SIZE = 256
+
+
+class SightingRing:
+    __memory: shared_memory.SharedMemory
+    __buffer: memoryview
+    __slots: int
+    __owner: bool
+    __head: int
+    __tail: int
+
+    def __init__(self, name: str = None, slots: int = 4096):
+        self.__owner = name is None
+        if self.__owner:
+            self.__memory = shared_memory.SharedMemory(create=True, size=Common.SLOTS_OFFSET + slots * Common.SLOT_SIZE)
+            self.__memory.buf[:Common.SLOTS_OFFSET] = bytes(Common.SLOTS_OFFSET)
+        else:
+            self.__memory = shared_memory.SharedMemory(name)
+        self.__buffer = self.__memory.buf
+        self.__slots = (self.__memory.size - Common.SLOTS_OFFSET) // Common.SLOT_SIZE
+        # A process attaching again resumes from the counters left in the shared header.
+        self.__head = Common.COUNTER.unpack_from(self.__buffer, Common.HEAD_OFFSET)[0]
+        self.__tail = Common.COUNTER.unpack_from(self.__buffer, Common.TAIL_OFFSET)[0]
+
+    @property
+    def name(self) -> str:
+        return self.__memory.name
+
+    @property
+    def advertisements(self) -> int:
+        return Common.COUNTER.unpack_from(self.__buffer, Common.ADVERTISEMENTS_OFFSET)[0]
+
+    @advertisements.setter
+    def advertisements(self, value: int):
+        Common.COUNTER.pack_into(self.__buffer, Common.ADVERTISEMENTS_OFFSET, value)
+
+    @property
+    def dropped(self) -> int:
+        return Common.COUNTER.unpack_from(self.__buffer, Common.DROPPED_OFFSET)[0]
+
+    def publish(self, timestamp: float, received: float, rssi: Optional[int], payload: bytes) -> bool:
+        tail = Common.COUNTER.unpack_from(self.__buffer, Common.TAIL_OFFSET)[0]
+        if self.__head - tail >= self.__slots or Common.SLOT_HEADER.size + len(payload) > Common.SLOT_SIZE:
+            Common.COUNTER.pack_into(self.__buffer, Common.DROPPED_OFFSET, self.dropped + 1)
+            return False
+
+        offset = Common.SLOTS_OFFSET + (self.__head % self.__slots) * Common.SLOT_SIZE
+        start = offset + Common.SLOT_HEADER.size
+        self.__buffer[start:start + len(payload)] = payload
+        # The sequence number is written with the slot header, after the payload, and the head is published last.
+        Common.SLOT_HEADER.pack_into(self.__buffer, offset, self.__head + 1, timestamp, received,
+                                     rssi if rssi is not None else 0, len(payload))
+        self.__head += 1
+        Common.COUNTER.pack_into(self.__buffer, Common.HEAD_OFFSET, self.__head)
+        return True
+
+    def drain(self, limit: int) -> list[tuple[float, float, int, bytes]]:
+        head = Common.COUNTER.unpack_from(self.__buffer, Common.HEAD_OFFSET)[0]
+        end = min(head, self.__tail + limit)
+        sightings = []
+        while self.__tail < end:
+            offset = Common.SLOTS_OFFSET + (self.__tail % self.__slots) * Common.SLOT_SIZE
+            sequence, timestamp, received, rssi, size = Common.SLOT_HEADER.unpack_from(self.__buffer, offset)
+            if sequence != self.__tail + 1:
+                break
+            start = offset + Common.SLOT_HEADER.size
+            sightings.append((timestamp, received, rssi, bytes(self.__buffer[start:start + size])))
+            self.__tail += 1
+        Common.COUNTER.pack_into(self.__buffer, Common.TAIL_OFFSET, self.__tail)
+        return sightings
+
+    def close(self):
+        self.__buffer = None
+        self.__memory.close()
+        if self.__owner:
+            self.__memory.unlink()
@@ -0,0 +1,65 @@
+import logging
+from typing import Optional, Type, TYPE_CHECKING
+
+import bleak
+
+if TYPE_CHECKING:
+    from ._beacon import Beacon
+
+
+def advertisement_patterns(beacon_types: list[Type['Beacon']]) -> Optional[tuple[tuple[int, int, bytes], ...]]:
+    patterns = []
+    for beacon_type in beacon_types:
+        beacon_patterns = beacon_type.patterns()
+        # A single vendor that cannot be filtered requires every advertisement.
+        if beacon_patterns is None:
+            return None
+        patterns.extend(pattern for pattern in beacon_patterns if pattern not in patterns)
+    return tuple(patterns)
+
+
+class FilteredScanner:
+    __logger: logging.Logger
+    __callback: callable
+    __patterns: Optional[tuple[tuple[int, int, bytes], ...]]
+    __adapter: Optional[str]
+    __scanner: Optional[bleak.BleakScanner]
+
+    def __init__(self, detection_callback: callable, patterns: tuple[tuple[int, int, bytes], ...] = None,
+                 adapter: str = None):
+        self.__logger = logging.getLogger(__name__)
+        self.__callback = detection_callback
+        self.__patterns = patterns
+        self.__adapter = adapter
+        self.__scanner = None
+
+    @property
+    def adapter(self) -> Optional[str]:
+        return self.__adapter
+
+    def __backend_arguments(self) -> dict[str, any]:
+        # Without an adapter, BlueZ scans on its default one, usually hci0.
+        return {'adapter': self.__adapter} if self.__adapter else {}
+
+    async def start(self):
+        if self.__scanner is None and self.__patterns:
+            # BlueZ advertisement monitors match the patterns before the advertisements reach the process. They need
+            # BlueZ 5.56 or later with experimental features enabled, otherwise all advertisements are scanned.
+            try:
+                scanner = bleak.BleakScanner(self.__callback, scanning_mode='passive',
+                                             bluez={'or_patterns': list(self.__patterns)},
+                                             **self.__backend_arguments())
+                await scanner.start()
+                self.__scanner = scanner
+                return
+            except Exception as e:
+                self.__logger.warning("Advertisement filtering unavailable: %s", e if e.args else type(e).__name__)
+                self.__patterns = None
+
+        if self.__scanner is None:
+            self.__scanner = bleak.BleakScanner(self.__callback, **self.__backend_arguments())
+        await self.__scanner.start()
+
+    async def stop(self):
+        if self.__scanner:
+            await self.__scanner.stop()
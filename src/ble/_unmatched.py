@@ -0,0 +1,36 @@
+import collections
+
+import bleak
+
+
+class UnmatchedDevices:
+    __entries: collections.OrderedDict[str, int]
+    __max_entries: int
+
+    # The default covers 10,000 devices in range, with headroom for rotating addresses. An entry, address string,
+    # payload hash and LRU node, takes about 176 bytes: under 3 MiB in total.
+    def __init__(self, max_entries: int = 16384):
+        self.__entries = collections.OrderedDict()
+        self.__max_entries = max_entries
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    @staticmethod
+    def __payload_hash(advertisement_data: bleak.AdvertisementData) -> int:
+        # Only the hash of the payload is kept, a device is parsed again when it changes.
+        return hash((tuple(advertisement_data.manufacturer_data.items()),
+                     tuple(advertisement_data.service_data.items())))
+
+    def known(self, device: bleak.BLEDevice, advertisement_data: bleak.AdvertisementData) -> bool:
+        payload_hash = self.__entries.get(device.address)
+        if payload_hash is None or payload_hash != self.__payload_hash(advertisement_data):
+            return False
+        self.__entries.move_to_end(device.address)
+        return True
+
+    def add(self, device: bleak.BLEDevice, advertisement_data: bleak.AdvertisementData):
+        self.__entries[device.address] = self.__payload_hash(advertisement_data)
+        self.__entries.move_to_end(device.address)
+        while len(self.__entries) > self.__max_entries:
+            self.__entries.popitem(last=False)
@@ -1,6 +1,14 @@
-from ._vendors import iBeacon, Eddystone
+from ._frames import Frame, Frames, matches_patterns
+from ._vendors import iBeacon, AltBeacon, Eddystone, EddystoneURL, EddystoneEID, EddystoneTLM
 
 __all__ = [
+    "Frame",
+    "Frames",
     "iBeacon",
-    "Eddystone"
+    "AltBeacon",
+    "Eddystone",
+    "EddystoneURL",
+    "EddystoneEID",
+    "EddystoneTLM",
+    "matches_patterns"
 ]
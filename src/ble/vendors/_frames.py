@@ -0,0 +1,118 @@
+import struct
+from typing import Optional
+
+import bleak
+
+
+class Common:
+    BASE_UUID_16 = '0000{}-0000-1000-8000-00805f9b34fb'
+    MANUFACTURER_SPECIFIC_DATA = 0xff
+    SERVICE_DATA_UUID16 = 0x16
+    APPLE_CID = 0x004c
+    UNKNOWN_CID = 0xffff
+    EDDYSTONE_SVC_UUID = BASE_UUID_16.format('feaa')
+
+
+def matches_patterns(advertisement_data: bleak.AdvertisementData, patterns: tuple[tuple[int, int, bytes], ...]) -> bool:
+    # Rebuilds the raw AD structures the controller matches advertisement monitor patterns against.
+    structures = [(Common.MANUFACTURER_SPECIFIC_DATA, manufacturer_id.to_bytes(2, 'little') + data)
+                  for manufacturer_id, data in advertisement_data.manufacturer_data.items()]
+    structures += [(Common.SERVICE_DATA_UUID16, int(service_uuid[4:8], 16).to_bytes(2, 'little') + data)
+                   for service_uuid, data in advertisement_data.service_data.items()
+                   if service_uuid[8:] == Common.BASE_UUID_16.format('')[4:]]
+    return any(structure_type == ad_type and data[start:start + len(content)] == content
+               for start, ad_type, content in patterns for structure_type, data in structures)
+
+
+class Frame:
+    __prefix: Optional[int]
+    __prefix_bytes: bytes
+    __struct: struct.Struct
+    __names: tuple[str, ...]
+    __tail: bool
+    __manufacturer_ids: Optional[tuple[int, ...]]
+    __service_uuid: Optional[str]
+
+    def __init__(self, fields: tuple[tuple[str, str], ...], prefix: tuple[str, int] = None, tail: bool = False,
+                 manufacturer_ids: tuple[int, ...] = None, service_uuid: str = None):
+        # The layout is compiled once into a big endian unpacker, the prefix being its first value.
+        prefix_format, self.__prefix = prefix or ('', None)
+        self.__prefix_bytes = struct.pack('>' + prefix_format, self.__prefix) if prefix else b''
+        self.__struct = struct.Struct('>' + prefix_format + ''.join(field_format for _, field_format in fields))
+        self.__names = tuple(name for name, _ in fields) + (('tail',) if tail else ())
+        self.__tail = tail
+        self.__manufacturer_ids = manufacturer_ids
+        self.__service_uuid = service_uuid
+
+    @property
+    def names(self) -> tuple[str, ...]:
+        return self.__names
+
+    @property
+    def size(self) -> int:
+        return self.__struct.size
+
+    @property
+    def patterns(self) -> tuple[tuple[int, int, bytes], ...]:
+        # Start position, advertising data type and content, matched by the controller against the raw AD structures
+        # where company IDs and 16-bit service UUIDs are little endian.
+        if self.__service_uuid is not None:
+            uuid16 = int(self.__service_uuid[4:8], 16).to_bytes(2, 'little')
+            return (0, Common.SERVICE_DATA_UUID16, uuid16 + self.__prefix_bytes),
+        if self.__manufacturer_ids is None:
+            return (2, Common.MANUFACTURER_SPECIFIC_DATA, self.__prefix_bytes),
+        return tuple((0, Common.MANUFACTURER_SPECIFIC_DATA, manufacturer_id.to_bytes(2, 'little') + self.__prefix_bytes)
+                     for manufacturer_id in self.__manufacturer_ids)
+
+    def unpack(self, data) -> Optional[tuple]:
+        # unpack_from reads bytes and memoryviews in place, only the tail is sliced (as a view when given one).
+        if len(data) < self.__struct.size:
+            return None
+        values = self.__struct.unpack_from(data)
+        if self.__prefix is not None:
+            if values[0] != self.__prefix:
+                return None
+            values = values[1:]
+        if self.__tail:
+            values += (data[self.__struct.size:],)
+        return values
+
+    def match(self, advertising_data: bleak.AdvertisementData) -> Optional[tuple]:
+        if self.__service_uuid is not None:
+            data = advertising_data.service_data.get(self.__service_uuid)
+            return self.unpack(data) if data else None
+
+        manufacturer_data = advertising_data.manufacturer_data
+        if self.__manufacturer_ids is None:
+            for data in manufacturer_data.values():
+                values = self.unpack(data)
+                if values is not None:
+                    return values
+            return None
+
+        for manufacturer_id in self.__manufacturer_ids:
+            data = manufacturer_data.get(manufacturer_id)
+            if data:
+                values = self.unpack(data)
+                if values is not None:
+                    return values
+        return None
+
+    def as_dict(self, values: tuple) -> dict[str, any]:
+        return dict(zip(self.__names, values))
+
+
+class Frames:
+    IBEACON = Frame((('uuid', '16s'), ('major', 'H'), ('minor', 'H'), ('tx_power', 'b')),
+                    prefix=('H', 0x0215), manufacturer_ids=(Common.APPLE_CID, Common.UNKNOWN_CID))
+    ALTBEACON = Frame((('uuid', '16s'), ('major', 'H'), ('minor', 'H'), ('reference_rssi', 'b'), ('reserved', 'B')),
+                      prefix=('H', 0xbeac))
+    EDDYSTONE_UID = Frame((('tx_power', 'b'), ('namespace', '10s'), ('instance', '6s')),
+                          prefix=('B', 0x00), service_uuid=Common.EDDYSTONE_SVC_UUID)
+    EDDYSTONE_URL = Frame((('tx_power', 'b'), ('scheme', 'B')),
+                          prefix=('B', 0x10), tail=True, service_uuid=Common.EDDYSTONE_SVC_UUID)
+    EDDYSTONE_TLM = Frame((('version', 'B'), ('battery', 'H'), ('temperature', 'h'), ('advertisements', 'I'),
+                           ('uptime', 'I')),
+                          prefix=('B', 0x20), service_uuid=Common.EDDYSTONE_SVC_UUID)
+    EDDYSTONE_EID = Frame((('tx_power', 'b'), ('eid', '8s')),
+                          prefix=('B', 0x30), service_uuid=Common.EDDYSTONE_SVC_UUID)
@@ -3,36 +3,28 @@ from uuid import UUID
 
 import bleak
 
+from ._frames import Frames
 from .._beacon import Beacon
+from .._cache import BoundedCache
 from .._exceptions import InvalidBeaconIDError, InvalidBeaconStateError
 
 
 class Common:
-    BASE_UUID_16 = '0000{}-0000-1000-8000-00805f9b34fb'
+    EDDYSTONE_URL_SCHEMES = ('http://www.', 'https://www.', 'http://', 'https://')
+    EDDYSTONE_URL_EXPANSIONS = ('.com/', '.org/', '.edu/', '.net/', '.info/', '.biz/', '.gov/',
+                                '.com', '.org', '.edu', '.net', '.info', '.biz', '.gov')
 
 
-class iBeacon(Beacon):
-    @classmethod
-    def vendor(cls) -> str:
-        return 'ibeacon'
-
-    __APPLE_CID = 0x004c
-    __UNKNOWN_CID = 0xffff
+class UUIDBeacon(Beacon):
+    __cache: BoundedCache['UUIDBeacon'] = BoundedCache()
 
     @classmethod
-    def match(cls, device: bleak.BLEDevice, advertising_data: bleak.AdvertisementData) -> Optional[Beacon]:
-        data = advertising_data.manufacturer_data.get(iBeacon.__APPLE_CID, None)
-        if not data:
-            data = advertising_data.manufacturer_data.get(iBeacon.__UNKNOWN_CID, None)
+    def _label(cls) -> str:
+        return cls.__name__
 
-        if not data or (data[0] != 0x02 and data[0:2] != [0xbe, 0xac]):
-            return
-
-        uuid = UUID(bytes=data[2:18])
-        major = int.from_bytes(bytearray(data[18:20]), 'big', signed=False)
-        minor = int.from_bytes(bytearray(data[20:22]), 'big', signed=False)
-        tx_pwr = int.from_bytes([data[22]], 'big', signed=True)
-        return cls(uuid, major, minor)
+    @classmethod
+    def _from_frame(cls, uuid: bytes, major: int, minor: int) -> 'UUIDBeacon':
+        return UUIDBeacon.__cache.get((cls, uuid, major, minor), lambda: cls(UUID(bytes=uuid), major, minor))
 
     @classmethod
     def from_id(cls, _id: str) -> Beacon:
@@ -54,19 +46,19 @@ class iBeacon(Beacon):
 
     @property
     def name(self) -> str:
-        return f"iBeacon: {self.__uuid}:{self.__major}:{self.__minor}"
+        return f"{self._label()}: {self.__uuid}:{self.__major}:{self.__minor}"
 
     def _get_id(self) -> str:
         return f"{self.__uuid}:{self.__major}:{self.__minor}"
 
     def __eq__(self, other):
-        return all([isinstance(other, iBeacon),
+        return all([type(other) is type(self),
                     other.__uuid == self.__uuid,
                     other.__major == self.__major,
                     other.__minor == self.__minor])
 
     def __hash__(self):
-        return hash((self.__uuid, self.__major, self.__minor))
+        return hash((self.vendor(), self.__uuid, self.__major, self.__minor))
 
     def _getstate(self):
         return {
@@ -83,30 +75,58 @@ class iBeacon(Beacon):
             raise InvalidBeaconStateError()
 
 
-class Eddystone(Beacon):
+class iBeacon(UUIDBeacon):
     @classmethod
     def vendor(cls) -> str:
-        return 'eddystone'
+        return 'ibeacon'
+
+    @classmethod
+    def patterns(cls) -> tuple[tuple[int, int, bytes], ...]:
+        return Frames.IBEACON.patterns
+
+    @classmethod
+    def match(cls, device: bleak.BLEDevice, advertising_data: bleak.AdvertisementData) -> Optional[Beacon]:
+        values = Frames.IBEACON.match(advertising_data)
+        if values:
+            uuid, major, minor, tx_power = values
+            return cls._from_frame(uuid, major, minor)
+
+
+class AltBeacon(UUIDBeacon):
+    @classmethod
+    def vendor(cls) -> str:
+        return 'altbeacon'
 
-    __SVC_UUID = Common.BASE_UUID_16.format('feaa')
-    __UID_BEACON = 0x00
-    __URL_BEACON = 0x10
-    __TLM_BEACON = 0x20
-    __EID_BEACON = 0x30
+    @classmethod
+    def patterns(cls) -> tuple[tuple[int, int, bytes], ...]:
+        return Frames.ALTBEACON.patterns
 
     @classmethod
     def match(cls, device: bleak.BLEDevice, advertising_data: bleak.AdvertisementData) -> Optional[Beacon]:
-        if Eddystone.__SVC_UUID not in advertising_data.service_data:
-            return
+        values = Frames.ALTBEACON.match(advertising_data)
+        if values:
+            uuid, major, minor, reference_rssi, reserved = values
+            return cls._from_frame(uuid, major, minor)
+
+
+class Eddystone(Beacon):
+    __cache: BoundedCache['Eddystone'] = BoundedCache()
+
+    @classmethod
+    def vendor(cls) -> str:
+        return 'eddystone'
 
-        data = advertising_data.service_data[Eddystone.__SVC_UUID]
-        beacon_type = data[0]
-        tx_pwr = int.from_bytes([data[1]], 'big', signed=True)
+    @classmethod
+    def patterns(cls) -> tuple[tuple[int, int, bytes], ...]:
+        return Frames.EDDYSTONE_UID.patterns
 
-        if beacon_type == Eddystone.__UID_BEACON:
-            namespace = bytes(data[2:12]).hex()
-            instance = bytes(data[12:18]).hex()
-            return cls(namespace, instance, advertising_data.local_name)
+    @classmethod
+    def match(cls, device: bleak.BLEDevice, advertising_data: bleak.AdvertisementData) -> Optional[Beacon]:
+        values = Frames.EDDYSTONE_UID.match(advertising_data)
+        if values:
+            tx_power, namespace, instance = values
+            return Eddystone.__cache.get((namespace, instance, advertising_data.local_name),
+                                         lambda: cls(namespace.hex(), instance.hex(), advertising_data.local_name))
 
     @classmethod
     def from_id(cls, _id: str) -> Beacon:
@@ -154,3 +174,199 @@ class Eddystone(Beacon):
             return cls(state['namespace'], state['instance'], state['name'])
         except (KeyError, ValueError, TypeError):
             raise InvalidBeaconStateError()
+
+
+class EddystoneURL(Beacon):
+    @classmethod
+    def vendor(cls) -> str:
+        return 'eddystone-url'
+
+    @classmethod
+    def patterns(cls) -> tuple[tuple[int, int, bytes], ...]:
+        return Frames.EDDYSTONE_URL.patterns
+
+    # Frames with an unknown scheme or an invalid character are not Eddystone URLs.
+    @staticmethod
+    def __decode_url(scheme: int, encoded: bytes) -> Optional[str]:
+        if scheme >= len(Common.EDDYSTONE_URL_SCHEMES):
+            return None
+        url = [Common.EDDYSTONE_URL_SCHEMES[scheme]]
+        for byte in bytes(encoded):
+            if byte < len(Common.EDDYSTONE_URL_EXPANSIONS):
+                url.append(Common.EDDYSTONE_URL_EXPANSIONS[byte])
+            elif 0x20 < byte < 0x7f:
+                url.append(chr(byte))
+            else:
+                return None
+        return ''.join(url)
+
+    @classmethod
+    def match(cls, device: bleak.BLEDevice, advertising_data: bleak.AdvertisementData) -> Optional[Beacon]:
+        values = Frames.EDDYSTONE_URL.match(advertising_data)
+        if values:
+            tx_power, scheme, encoded = values
+            url = EddystoneURL.__decode_url(scheme, encoded)
+            if url:
+                return cls(url, advertising_data.local_name)
+
+    @classmethod
+    def from_id(cls, _id: str) -> Beacon:
+        if not _id:
+            raise InvalidBeaconIDError()
+        return cls(_id)
+
+    __url: str
+    __name: Optional[str]
+
+    def __init__(self, url: str, name: Optional[str] = None):
+        self.__url = url
+        self.__name = name
+
+    @property
+    def name(self) -> str:
+        return self.__name or f"Eddystone URL: {self.__url}"
+
+    def _get_id(self) -> str:
+        return self.__url
+
+    def __eq__(self, other):
+        return isinstance(other, EddystoneURL) and other.__url == self.__url
+
+    def __hash__(self):
+        return hash(self.__url)
+
+    def _getstate(self):
+        return {
+            'url': self.__url,
+            'name': self.__name
+        }
+
+    @classmethod
+    def __setstate__(cls, state):
+        try:
+            return cls(state['url'], state['name'])
+        except (KeyError, ValueError, TypeError):
+            raise InvalidBeaconStateError()
+
+
+class EddystoneEID(Beacon):
+    @classmethod
+    def vendor(cls) -> str:
+        return 'eddystone-eid'
+
+    @classmethod
+    def patterns(cls) -> tuple[tuple[int, int, bytes], ...]:
+        return Frames.EDDYSTONE_EID.patterns
+
+    @classmethod
+    def match(cls, device: bleak.BLEDevice, advertising_data: bleak.AdvertisementData) -> Optional[Beacon]:
+        values = Frames.EDDYSTONE_EID.match(advertising_data)
+        if values:
+            tx_power, eid = values
+            return cls(eid.hex(), advertising_data.local_name)
+
+    @classmethod
+    def from_id(cls, _id: str) -> Beacon:
+        try:
+            bytes.fromhex(_id)
+            return cls(_id)
+        except (ValueError, TypeError):
+            raise InvalidBeaconIDError()
+
+    __eid: str
+    __name: Optional[str]
+
+    def __init__(self, eid: str, name: Optional[str] = None):
+        self.__eid = eid
+        self.__name = name
+
+    @property
+    def name(self) -> str:
+        return self.__name or f"Eddystone EID: {self.__eid}"
+
+    def _get_id(self) -> str:
+        return self.__eid
+
+    def __eq__(self, other):
+        return isinstance(other, EddystoneEID) and other.__eid == self.__eid
+
+    def __hash__(self):
+        return hash(self.__eid)
+
+    def _getstate(self):
+        return {
+            'eid': self.__eid,
+            'name': self.__name
+        }
+
+    @classmethod
+    def __setstate__(cls, state):
+        try:
+            return cls(state['eid'], state['name'])
+        except (KeyError, ValueError, TypeError):
+            raise InvalidBeaconStateError()
+
+
+class EddystoneTLM(Beacon):
+    @classmethod
+    def vendor(cls) -> str:
+        return 'eddystone-tlm'
+
+    @classmethod
+    def patterns(cls) -> tuple[tuple[int, int, bytes], ...]:
+        return Frames.EDDYSTONE_TLM.patterns
+
+    # Telemetry frames carry no identifier, the beacon is identified by its address.
+    @classmethod
+    def match(cls, device: bleak.BLEDevice, advertising_data: bleak.AdvertisementData) -> Optional[Beacon]:
+        values = Frames.EDDYSTONE_TLM.match(advertising_data)
+        if values:
+            version, battery, temperature, advertisements, uptime = values
+            # Version 0 is unencrypted, other versions carry an encrypted payload.
+            if version != 0:
+                return
+            return cls(device.address, advertising_data.local_name, battery, temperature / 256)
+
+    @classmethod
+    def from_id(cls, _id: str) -> Beacon:
+        if not _id:
+            raise InvalidBeaconIDError()
+        return cls(_id)
+
+    __address: str
+    __name: Optional[str]
+
+    battery: Optional[int]
+    temperature: Optional[float]
+
+    def __init__(self, address: str, name: Optional[str] = None, battery: int = None, temperature: float = None):
+        self.__address = address
+        self.__name = name
+        self.battery = battery
+        self.temperature = temperature
+
+    @property
+    def name(self) -> str:
+        return self.__name or f"Eddystone TLM: {self.__address}"
+
+    def _get_id(self) -> str:
+        return self.__address
+
+    def __eq__(self, other):
+        return isinstance(other, EddystoneTLM) and other.__address == self.__address
+
+    def __hash__(self):
+        return hash(self.__address)
+
+    def _getstate(self):
+        return {
+            'address': self.__address,
+            'name': self.__name
+        }
+
+    @classmethod
+    def __setstate__(cls, state):
+        try:
+            return cls(state['address'], state['name'])
+        except (KeyError, ValueError, TypeError):
+            raise InvalidBeaconStateError()
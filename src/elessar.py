@@ -1,92 +1,158 @@
 import asyncio
+import datetime
 import json
 import logging
-from typing import Generator, Optional
+import re
+import types
+from typing import AsyncGenerator, Optional
 
 import quart
 
 import ble
 import ble.vendors
+import history
 import hue
+import metrics
+import tracing
 
 
-class Elessar(quart.Quart):
+class Site:
+    __CAPTURE_MAX_SIZE = 64 * 1024 * 1024
+
+    __name: str
+    __logger: logging.Logger
+    __blueprint: quart.Blueprint
     __beacon_manager: ble.BeaconManager
     __hue_bridge_manager: hue.BridgeManager
+    __pairing_manager: hue.PairingManager
+    __tracer: tracing.Tracer
     __configuration_path: str
+    __adapter: Optional[str]
     __lights_state: Optional[bool]
     __force_lights_state: bool
 
-    def __init__(self, configuration_path: str):
-        super().__init__('Elessar')
-
+    def __init__(self, name: str, configuration_path: str, bridge_manager: hue.BridgeManager, logger: logging.Logger,
+                 scanner_factory: callable = None, clock: ble.Clock = None, capture_path: str = None,
+                 scan_process: bool = False, history_path: str = None, adapter: str = None):
+        self.__name = name
+        self.__logger = logger
+        self.__configuration_path = configuration_path
+        # The scanner is created with the site, its adapter is read ahead of the rest of the configuration.
+        self.__adapter = adapter or self.__configured_adapter()
         self.__beacon_manager = ble.BeaconManager(self.__available_beacons_updated, [
             ble.vendors.iBeacon,
-            ble.vendors.Eddystone
-        ])
-        self.__hue_bridge_manager = hue.BridgeManager()
-        self.__configuration_path = configuration_path
+            ble.vendors.AltBeacon,
+            ble.vendors.Eddystone,
+            ble.vendors.EddystoneURL,
+            ble.vendors.EddystoneEID,
+            ble.vendors.EddystoneTLM
+        ], scanner_factory, clock, scan_process, name, self.__adapter)
+        if capture_path:
+            self.__beacon_manager.capture = ble.CaptureWriter(capture_path, self.__CAPTURE_MAX_SIZE)
+        if history_path:
+            self.__beacon_manager.history = history.SightingHistory(history_path)
+            self.__beacon_manager.history.open()
+        self.__beacon_manager.needs_refresh = self.__lights_refresh_needed
+        self.__hue_bridge_manager = bridge_manager
+        self.__pairing_manager = hue.PairingManager(bridge_manager, lambda bridge: self.save_configuration())
+        self.__tracer = tracing.Tracer()
         self.__lights_state = None
         self.__force_lights_state = False
 
-        self.add_url_rule('/', 'index', self.index, methods=['GET'])
-        self.add_url_rule('/', 'configure', self.configure, methods=['POST'])
+        self.__blueprint = quart.Blueprint(f'site_{name}' if name else 'site', __name__)
+        self.__blueprint.add_url_rule('/', 'index', self.index, methods=['GET'])
+        self.__blueprint.add_url_rule('/', 'configure', self.configure, methods=['POST'])
+        self.__blueprint.add_url_rule('/traces', 'traces', self.traces, methods=['GET'])
+        self.__blueprint.add_url_rule('/history', 'history', self.history, methods=['GET'])
+        self.__blueprint.add_url_rule('/pair/<bridge_id>', 'pair', self.pair, methods=['POST'])
 
-        logging.getLogger(ble.__name__).parent = self.logger
-        logging.getLogger(hue.__name__).parent = self.logger
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def blueprint(self) -> quart.Blueprint:
+        return self.__blueprint
+
+    @property
+    def adapter(self) -> Optional[str]:
+        return self.__adapter
 
-    async def __connected_bridges(self, available_bridges: dict[str, str]) -> Generator[hue.Bridge, None, None]:
-        for bridge in self.__hue_bridge_manager.bridges.values():
+    # Bridges are paired in the background, paired bridges that lost their address are reconnected on demand.
+    async def __connected_bridges(self, available_bridges: dict[str, str]) -> AsyncGenerator[hue.Bridge, None]:
+        for bridge in list(self.__hue_bridge_manager.bridges.values()):
             if bridge.id not in available_bridges:
                 continue
-            try:
-                if not bridge.connected:
-                    await bridge.connect(self.__hue_bridge_manager.get_bridge_ip(bridge.id))
+            if not bridge.connected and bridge.paired:
+                # The bridge just answered at this address, its credentials are checked by the next request.
+                try:
+                    await bridge.connect(self.__hue_bridge_manager.get_bridge_ip(bridge.id), verify=False)
+                except Exception as e:
+                    self.__logger.warning(e if e.args else type(e))
+                    continue
+            if bridge.connected:
                 yield bridge
-            except hue.ButtonNotPressedError as e:
-                self.logger.debug(e)
-            except Exception as e:
-                self.logger.warning(e if e.args else type(e))
 
     async def __set_lights(self, value: bool):
         if self.__lights_state is not None and not self.__force_lights_state:
             if value == self.__lights_state:
                 return
 
-        available_bridges = await self.__hue_bridge_manager.available_bridges
-        remaining = len(self.__hue_bridge_manager.bridges)
-        async for bridge in self.__connected_bridges(available_bridges):
-            try:
-                await bridge.set_groups_on(value)
-                remaining -= 1
-                self.logger.debug("Lights set to '%s' on bridge '%s'", "on" if value else "off", bridge.id)
-            except Exception as e:
-                self.logger.warning(e if e.args else type(e))
-
-        self.__lights_state = value if remaining == 0 else None
+        trace = tracing.current()
+        tracing.mark('set_lights')
+        try:
+            with tracing.span('available_bridges'):
+                available_bridges = await self.__hue_bridge_manager.available_bridges
+            remaining = len(self.__hue_bridge_manager.bridges)
+            async for bridge in self.__connected_bridges(available_bridges):
+                try:
+                    await bridge.set_groups_on(value)
+                    remaining -= 1
+                    self.__logger.debug("Lights set to '%s' on bridge '%s'", "on" if value else "off", bridge.id)
+                except Exception as e:
+                    self.__logger.warning(e if e.args else type(e))
+
+            self.__lights_state = value if remaining == 0 else None
+        finally:
+            if trace:
+                trace.attributes['lights'] = "on" if value else "off"
+                trace.attributes['applied'] = self.__lights_state == value
+                self.__tracer.finish(trace)
+
+    # Forced lights are applied every scan period, and so are updates a bridge did not apply.
+    def __lights_refresh_needed(self) -> bool:
+        return self.__force_lights_state or self.__lights_state is None
 
     def __available_beacons_updated(self):
         if len(self.__beacon_manager.beacons) == 0:
             return
         asyncio.ensure_future(self.__set_lights(self.__beacon_manager.has_active_beacon))
 
+    def __configured_adapter(self) -> Optional[str]:
+        # Errors are reported when the whole configuration is loaded.
+        try:
+            with open(self.__configuration_path, 'r') as file:
+                return json.load(file).get('adapter')
+        except Exception:
+            return None
+
     def load_configuration(self):
         try:
             with open(self.__configuration_path, 'r') as file:
                 data = json.load(file)
         except Exception as e:
-            self.logger.info(e if e.args else type(e))
+            self.__logger.info(e if e.args else type(e))
             return
 
         try:
             self.__beacon_manager.scan_period = int(data['scan_period'])
         except Exception as e:
-            self.logger.warning(e if e.args else type(e))
+            self.__logger.warning(e if e.args else type(e))
 
         try:
             self.__force_lights_state = bool(data['force_lights_state'])
         except Exception as e:
-            self.logger.warning(e if e.args else type(e))
+            self.__logger.warning(e if e.args else type(e))
 
         beacons = {}
         for beacon_state in data.get('beacons', []):
@@ -94,7 +160,7 @@ class Elessar(quart.Quart):
                 beacon = self.__beacon_manager.from_state(beacon_state)
                 beacons[beacon.id] = beacon
             except Exception as e:
-                self.logger.warning(e if e.args else type(e))
+                self.__logger.warning(e if e.args else type(e))
         self.__beacon_manager.beacons = beacons
 
         bridges = {}
@@ -103,9 +169,9 @@ class Elessar(quart.Quart):
                 bridge = hue.Bridge.from_state(self.__hue_bridge_manager.session, bridge_state)
                 bridges[bridge.id] = bridge
             except Exception as e:
-                self.logger.warning(e if e.args else type(e))
+                self.__logger.warning(e if e.args else type(e))
         self.__hue_bridge_manager.bridges = bridges
-        self.logger.debug('Configuration loaded')
+        self.__logger.debug('Configuration loaded')
 
     def save_configuration(self):
         try:
@@ -115,17 +181,17 @@ class Elessar(quart.Quart):
                 'beacons': [beacon.__getstate__() for beacon in self.__beacon_manager.beacons.values()],
                 'bridges': [bridge.__getstate__() for bridge in self.__hue_bridge_manager.bridges.values()]
             }
+            if self.__adapter:
+                data['adapter'] = self.__adapter
             with open(self.__configuration_path, 'w') as file:
                 json.dump(data, file, indent=4)
-            self.logger.debug('Configuration saved')
+            self.__logger.debug('Configuration saved')
         except Exception as e:
-            self.logger.warning(e if e.args else type(e))
+            self.__logger.warning(e if e.args else type(e))
 
     async def index(self):
-        available_bridges = await self.__hue_bridge_manager.available_bridges
-        # Try to connect to all configured bridges.
-        async for _ in self.__connected_bridges(available_bridges):
-            pass
+        # Page views render the discovered bridges and the pairing state, bridges are only probed when lights are set.
+        available_bridges = self.__hue_bridge_manager.known_bridges
 
         return await quart.render_template('index.html',
                                            scan_period=self.__beacon_manager.scan_period,
@@ -133,7 +199,43 @@ class Elessar(quart.Quart):
                                            available_beacons=self.__beacon_manager.available_beacons,
                                            beacons=self.__beacon_manager.beacons,
                                            available_bridges=available_bridges,
-                                           bridges=self.__hue_bridge_manager.bridges)
+                                           bridges=self.__hue_bridge_manager.bridges,
+                                           pairing={bridge_id: self.__pairing_manager.status(bridge_id)
+                                                    for bridge_id in self.__hue_bridge_manager.bridges},
+                                           traces=self.__tracer.records(),
+                                           site=self.__name)
+
+    async def traces(self):
+        return quart.jsonify(self.__tracer.records(slow='slow' in quart.request.args))
+
+    async def history(self):
+        sighting_history = self.__beacon_manager.history
+        if not sighting_history:
+            quart.abort(404)
+
+        # Times are ISO 8601, local unless they have an offset. The range defaults to today so far.
+        now = datetime.datetime.now().astimezone()
+        try:
+            start = datetime.datetime.fromisoformat(quart.request.args['start']).astimezone() \
+                if 'start' in quart.request.args else now.replace(hour=0, minute=0, second=0, microsecond=0)
+            end = datetime.datetime.fromisoformat(quart.request.args['end']).astimezone() \
+                if 'end' in quart.request.args else now
+        except ValueError as e:
+            quart.abort(400, str(e))
+        beacon_ids = set(quart.request.args.getlist('beacon[]')) or None
+
+        occupancy, dwell = await asyncio.to_thread(sighting_history.occupancy, start.timestamp(),
+                                                   end.timestamp(), beacon_ids, now.timestamp())
+        return quart.jsonify({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'occupied_seconds': sum(interval_end - interval_start for interval_start, interval_end in occupancy),
+            'occupancy': [{
+                'start': datetime.datetime.fromtimestamp(interval_start, start.tzinfo).isoformat(),
+                'end': datetime.datetime.fromtimestamp(interval_end, start.tzinfo).isoformat()
+            } for interval_start, interval_end in occupancy],
+            'dwell_seconds': dwell
+        })
 
     async def configure(self):
         data = await quart.request.form
@@ -159,24 +261,118 @@ class Elessar(quart.Quart):
         for add_bridge_id in bridge_ids.difference(self.__hue_bridge_manager.bridges.keys()):
             self.__hue_bridge_manager.bridges[add_bridge_id] = hue.Bridge(self.__hue_bridge_manager.session,
                                                                           add_bridge_id)
+            # A bridge is usually added right after its link button was pressed.
+            self.__pairing_manager.pair(add_bridge_id)
 
         for bridge_id in self.__hue_bridge_manager.bridges.keys():
             group_ids = data.getlist(f"group[{bridge_id}][]")
             self.__hue_bridge_manager.bridges[bridge_id].group_ids = set(group_ids)
 
         self.save_configuration()
+        # Presence is only notified on appear and disappear edges, apply the new selection right away.
+        self.__available_beacons_updated()
+
+        return quart.redirect(quart.url_for('.index'))
+
+    async def pair(self, bridge_id: str):
+        self.__pairing_manager.pair(bridge_id)
+        return quart.redirect(quart.url_for('.index'))
+
+    def start(self):
+        self.__hue_bridge_manager.start()
+        self.load_configuration()
+        self.__pairing_manager.start()
+
+    async def run(self):
+        await self.__beacon_manager.start()
+
+    async def stop(self):
+        self.__beacon_manager.stop()
+        # The scan loop closes the history once it exits, which the application does not wait for.
+        if self.__beacon_manager.history:
+            self.__beacon_manager.history.flush()
+        await self.__pairing_manager.stop()
+        await self.__hue_bridge_manager.stop()
+
+
+class Elessar(quart.Quart):
+    __sites: dict[str, Site]
+    __session: hue.BridgeClientSession
+    __discovery: hue.BridgeDiscovery
+
+    def __init__(self, configuration_path: str = None, scanner_factory: callable = None,
+                 bridge_manager: hue.BridgeManager = None, clock: ble.Clock = None, capture_path: str = None,
+                 scan_process: bool = False, history_path: str = None, adapter: str = None):
+        super().__init__('Elessar')
+
+        self.__sites = {}
+        # Sites share the event loop, the Hue connection pool and the mDNS browser.
+        self.__session = hue.BridgeClientSession()
+        self.__discovery = hue.BridgeDiscovery()
+
+        self.add_url_rule('/metrics', 'metrics', self.metrics, methods=['GET'])
+
+        logging.getLogger(ble.__name__).parent = self.logger
+        logging.getLogger(hue.__name__).parent = self.logger
+        logging.getLogger(tracing.__name__).parent = self.logger
+        logging.getLogger(history.__name__).parent = self.logger
+
+        # A single unnamed site is served from the root, otherwise named sites are added with add_site.
+        if configuration_path:
+            self.__add_site('', None, self.logger, configuration_path, scanner_factory, bridge_manager, clock,
+                            capture_path, scan_process, history_path, adapter)
+        else:
+            self.add_url_rule('/', 'index', self.index, methods=['GET'])
+
+    @property
+    def sites(self) -> types.MappingProxyType[str, Site]:
+        return types.MappingProxyType(self.__sites)
+
+    def add_site(self, name: str, configuration_path: str, scanner_factory: callable = None,
+                 bridge_manager: hue.BridgeManager = None, clock: ble.Clock = None, capture_path: str = None,
+                 scan_process: bool = False, history_path: str = None, adapter: str = None) -> Site:
+        # Names prefix the site URLs and log records, the root belongs to the list of sites.
+        if not re.fullmatch(r'[\w-]+', name or ''):
+            raise ValueError(f"Invalid site name '{name}'")
+        if name in self.__sites or '' in self.__sites:
+            raise ValueError(f"Site '{name}' already exists" if name in self.__sites else
+                             "Sites cannot be added to a single site application")
+
+        return self.__add_site(name, f'/sites/{name}', self.logger.getChild(name), configuration_path,
+                               scanner_factory, bridge_manager, clock, capture_path, scan_process, history_path,
+                               adapter)
+
+    def __add_site(self, name: str, url_prefix: Optional[str], logger: logging.Logger, configuration_path: str,
+                   scanner_factory: callable = None, bridge_manager: hue.BridgeManager = None, clock: ble.Clock = None,
+                   capture_path: str = None, scan_process: bool = False, history_path: str = None,
+                   adapter: str = None) -> Site:
+        site = Site(name, configuration_path,
+                    bridge_manager or hue.BridgeManager(self.__session, discovery=self.__discovery),
+                    logger, scanner_factory, clock, capture_path, scan_process, history_path, adapter)
+        if not scanner_factory:
+            for other in self.__sites.values():
+                if other.adapter == site.adapter:
+                    self.logger.warning("Sites '%s' and '%s' scan on the same adapter, they see the same beacons",
+                                        other.name, site.name)
+        self.register_blueprint(site.blueprint, url_prefix=url_prefix)
+        self.__sites[name] = site
+        return site
+
+    async def index(self):
+        return await quart.render_template('sites.html', sites=sorted(self.__sites))
 
-        return quart.redirect('/')
+    async def metrics(self):
+        return quart.Response(metrics.REGISTRY.expose(), content_type=metrics.CONTENT_TYPE)
 
     async def startup(self):
         await super().startup()
         async with self.app_context():
-            self.add_background_task(self.__beacon_manager.start)
-            self.__hue_bridge_manager.start()
-            self.load_configuration()
+            for site in self.__sites.values():
+                self.add_background_task(site.run)
+                site.start()
 
     async def shutdown(self):
         async with self.app_context():
-            self.__beacon_manager.stop()
-            await self.__hue_bridge_manager.stop()
+            for site in self.__sites.values():
+                await site.stop()
         await super().shutdown()
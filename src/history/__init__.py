@@ -0,0 +1,7 @@
+from ._history import Event, Segment, SightingHistory
+
+__all__ = [
+    "Event",
+    "Segment",
+    "SightingHistory"
+]
@@ -0,0 +1,294 @@
+import bisect
+import logging
+import mmap
+import os
+import struct
+import time
+from typing import Iterable, Optional
+
+
+class Event:
+    DISAPPEARED = 0
+    APPEARED = 1
+    SEEN = 2
+
+
+class Common:
+    SEGMENT_HEADER = struct.Struct('<8sHII')
+    MAGIC = b'ELESSARH'
+    VERSION = 1
+    # Write timestamp, beacon index, event, RSSI and how long before the write the beacon was last seen, in
+    # tenths of a second. Records are appended in write order, so timestamps only increase within the store.
+    RECORD = struct.Struct('<dIBbH')
+    NO_RSSI = -128
+    MAX_LAG = 0xffff
+    SEGMENT_SUFFIX = '.seg'
+    BEACONS_FILE = 'beacons.txt'
+
+
+class Segment:
+    __path: str
+    __file: Optional[object]
+    __mmap: Optional[mmap.mmap]
+    __capacity: int
+    __count: int
+
+    def __init__(self, path: str, capacity: int = None):
+        self.__path = path
+        self.__file = None
+        self.__mmap = None
+        self.__capacity = capacity or 0
+        self.__count = 0
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def count(self) -> int:
+        return self.__count
+
+    @property
+    def full(self) -> bool:
+        return self.__count >= self.__capacity
+
+    def open(self, writable: bool = False):
+        if writable and not os.path.exists(self.__path):
+            # Segments are allocated once, appending only dirties the pages holding the new records.
+            with open(self.__path, 'wb') as file:
+                file.write(Common.SEGMENT_HEADER.pack(Common.MAGIC, Common.VERSION, self.__capacity, 0))
+                file.truncate(Common.SEGMENT_HEADER.size + self.__capacity * Common.RECORD.size)
+
+        self.__file = open(self.__path, 'r+b' if writable else 'rb')
+        self.__mmap = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        magic, version, self.__capacity, self.__count = Common.SEGMENT_HEADER.unpack_from(self.__mmap)
+        if magic != Common.MAGIC or version != Common.VERSION:
+            self.close()
+            raise ValueError(f"'{self.__path}' is not a sighting history segment")
+
+    def close(self):
+        if self.__mmap:
+            self.__mmap.close()
+            self.__mmap = None
+        if self.__file:
+            self.__file.close()
+            self.__file = None
+
+    def flush(self):
+        if self.__mmap:
+            self.__mmap.flush()
+
+    def append(self, timestamp: float, beacon_index: int, event: int, rssi: int, lag: int):
+        Common.RECORD.pack_into(self.__mmap, Common.SEGMENT_HEADER.size + self.__count * Common.RECORD.size,
+                                timestamp, beacon_index, event, rssi, lag)
+        self.__count += 1
+        # The count is written last, readers never see a partial record.
+        Common.SEGMENT_HEADER.pack_into(self.__mmap, 0, Common.MAGIC, Common.VERSION, self.__capacity, self.__count)
+
+    def timestamp(self, index: int) -> float:
+        return Common.RECORD.unpack_from(self.__mmap, Common.SEGMENT_HEADER.size + index * Common.RECORD.size)[0]
+
+    def records(self, start: float, end: float) -> Iterable[tuple[float, int, int, int, int]]:
+        count = Common.SEGMENT_HEADER.unpack_from(self.__mmap)[3]
+        # Records are sorted by timestamp, the range is located by bisection and unpacked in one pass.
+        first = bisect.bisect_left(range(count), start, key=self.timestamp)
+        last = bisect.bisect_right(range(count), end, key=self.timestamp)
+        offset = Common.SEGMENT_HEADER.size
+        return Common.RECORD.iter_unpack(self.__mmap[offset + first * Common.RECORD.size:
+                                                     offset + last * Common.RECORD.size])
+
+
+class SightingHistory:
+    __logger: logging.Logger
+    __path: str
+    __segment_capacity: int
+    __segment_duration: float
+    __retention: float
+    __segments: list[tuple[float, str]]
+    __segment: Optional[Segment]
+    __segment_start: float
+    __beacon_ids: list[str]
+    __beacon_indexes: dict[str, int]
+    __last_checkpoint: float
+
+    checkpoint_interval: float
+
+    def __init__(self, path: str, segment_capacity: int = 65536, segment_duration: float = 24 * 3600,
+                 retention: float = 90 * 24 * 3600, checkpoint_interval: float = 60):
+        self.__logger = logging.getLogger(__name__)
+        self.__path = path
+        self.__segment_capacity = segment_capacity
+        self.__segment_duration = segment_duration
+        self.__retention = retention
+        self.__segments = []
+        self.__segment = None
+        self.__segment_start = 0
+        self.__beacon_ids = []
+        self.__beacon_indexes = {}
+        self.__last_checkpoint = 0
+        self.checkpoint_interval = checkpoint_interval
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    def open(self):
+        os.makedirs(self.__path, exist_ok=True)
+        beacons_path = os.path.join(self.__path, Common.BEACONS_FILE)
+        if os.path.exists(beacons_path):
+            with open(beacons_path, 'r') as file:
+                self.__beacon_ids = file.read().splitlines()
+        self.__beacon_indexes = {beacon_id: index for index, beacon_id in enumerate(self.__beacon_ids)}
+
+        # Segment files are named after the timestamp of their first record.
+        self.__segments = sorted((float(name[:-len(Common.SEGMENT_SUFFIX)]), os.path.join(self.__path, name))
+                                 for name in os.listdir(self.__path) if name.endswith(Common.SEGMENT_SUFFIX))
+
+    def close(self):
+        if self.__segment:
+            self.__segment.close()
+            self.__segment = None
+
+    def flush(self):
+        if self.__segment:
+            self.__segment.flush()
+
+    def __beacon_index(self, beacon_id: str) -> int:
+        index = self.__beacon_indexes.get(beacon_id)
+        if index is None:
+            with open(os.path.join(self.__path, Common.BEACONS_FILE), 'a') as file:
+                file.write(beacon_id + '\n')
+            index = self.__beacon_indexes[beacon_id] = len(self.__beacon_ids)
+            self.__beacon_ids.append(beacon_id)
+        return index
+
+    def __expire_segments(self, now: float):
+        # A segment ends where the next one starts, the current segment is never removed.
+        while len(self.__segments) > 1 and self.__segments[1][0] < now - self.__retention:
+            _, path = self.__segments.pop(0)
+            os.remove(path)
+            self.__logger.debug("Sighting history segment '%s' removed", path)
+
+    def __rotate(self, timestamp: float):
+        # Closing a segment does not wait for its pages to be written back.
+        self.flush()
+        self.close()
+        path = os.path.join(self.__path, f"{timestamp:.6f}{Common.SEGMENT_SUFFIX}")
+        self.__segment = Segment(path, self.__segment_capacity)
+        self.__segment.open(writable=True)
+        self.__segment_start = timestamp
+        self.__segments.append((timestamp, path))
+        self.__expire_segments(timestamp)
+
+    def __resume(self):
+        # After a restart, records are appended to the last segment instead of allocating a new one.
+        segment_start, path = self.__segments[-1]
+        segment = Segment(path)
+        try:
+            segment.open(writable=True)
+        except (OSError, ValueError) as e:
+            self.__logger.warning(e if e.args else type(e))
+            return
+        self.__segment = segment
+        self.__segment_start = segment_start
+
+    def record(self, timestamp: float, beacon_id: str, event: int, last_seen: float = None, rssi: int = None):
+        if self.__segment is None and self.__segments:
+            self.__resume()
+        if self.__segment is None or self.__segment.full or \
+                timestamp - self.__segment_start >= self.__segment_duration:
+            self.__rotate(timestamp)
+        lag = 0 if last_seen is None else min(max(round((timestamp - last_seen) * 10), 0), Common.MAX_LAG)
+        self.__segment.append(timestamp, self.__beacon_index(beacon_id), event,
+                              Common.NO_RSSI if rssi is None else max(rssi, Common.NO_RSSI + 1), lag)
+
+    def checkpoint_due(self, now: float) -> bool:
+        return now - self.__last_checkpoint >= self.checkpoint_interval
+
+    # Present beacons are recorded periodically, bounding what is lost when the application stops abruptly and
+    # letting queries start close to their range instead of at the appearance of the beacons.
+    def checkpoint(self, now: float, last_seen: dict[str, float]):
+        self.__last_checkpoint = now
+        for beacon_id, beacon_last_seen in last_seen.items():
+            self.record(now, beacon_id, Event.SEEN, beacon_last_seen)
+
+    def __records(self, start: float, end: float) -> Iterable[tuple[float, int, int, int, int]]:
+        # Queries run in another thread while segments are rotated and expired, they work on a snapshot.
+        segments = list(self.__segments)
+        first = max(bisect.bisect_right([segment_start for segment_start, _ in segments], start) - 1, 0)
+        for segment_start, path in segments[first:]:
+            if segment_start > end:
+                break
+            segment = Segment(path)
+            try:
+                segment.open()
+            except FileNotFoundError:
+                # Expired since the snapshot.
+                continue
+            except (OSError, ValueError) as e:
+                self.__logger.warning(e if e.args else type(e))
+                continue
+            try:
+                yield from segment.records(start, end)
+            finally:
+                segment.close()
+
+    def intervals(self, start: float, end: float, beacon_ids: set[str] = None,
+                  now: float = None) -> dict[str, list[tuple[float, float]]]:
+        now = time.time() if now is None else now
+        # Present beacons have a record at least every checkpoint, earlier records are not needed.
+        window_start = start - 2 * self.checkpoint_interval
+        window_end = end + Common.MAX_LAG / 10
+        opened: dict[int, tuple[float, float]] = {}
+        intervals: dict[int, list[tuple[float, float]]] = {}
+        indexes = None if beacon_ids is None else {self.__beacon_indexes[beacon_id] for beacon_id in beacon_ids
+                                                   if beacon_id in self.__beacon_indexes}
+
+        for timestamp, beacon_index, event, _, lag in self.__records(window_start, window_end):
+            if indexes is not None and beacon_index not in indexes:
+                continue
+            last_seen = timestamp - lag / 10
+            interval = opened.get(beacon_index)
+            if event == Event.APPEARED:
+                if interval:
+                    # The application stopped while the beacon was present, it was last known present at that time.
+                    intervals.setdefault(beacon_index, []).append(interval)
+                opened[beacon_index] = (last_seen, last_seen)
+            elif event == Event.SEEN:
+                opened[beacon_index] = (interval[0] if interval else max(window_start, last_seen - self.checkpoint_interval),
+                                        last_seen)
+            else:
+                intervals.setdefault(beacon_index, []).append(
+                    (interval[0] if interval else window_start, last_seen))
+                opened.pop(beacon_index, None)
+
+        for beacon_index, (interval_start, interval_last_seen) in opened.items():
+            # Without a later checkpoint the application stopped, otherwise the beacon is still present.
+            ongoing = now - interval_last_seen <= 2 * self.checkpoint_interval
+            intervals.setdefault(beacon_index, []).append((interval_start, now if ongoing else interval_last_seen))
+
+        result = {}
+        for beacon_index, beacon_intervals in intervals.items():
+            clipped = [(max(interval_start, start), min(interval_end, end))
+                       for interval_start, interval_end in beacon_intervals
+                       if interval_end > start and interval_start < end]
+            if clipped:
+                result[self.__beacon_ids[beacon_index]] = clipped
+        return result
+
+    @staticmethod
+    def union(intervals: Iterable[tuple[float, float]]) -> list[tuple[float, float]]:
+        merged = []
+        for interval_start, interval_end in sorted(intervals):
+            if merged and interval_start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], interval_end))
+            else:
+                merged.append((interval_start, interval_end))
+        return merged
+
+    def occupancy(self, start: float, end: float, beacon_ids: set[str] = None,
+                  now: float = None) -> tuple[list[tuple[float, float]], dict[str, float]]:
+        intervals = self.intervals(start, end, beacon_ids, now)
+        dwell = {beacon_id: sum(interval_end - interval_start for interval_start, interval_end in beacon_intervals)
+                 for beacon_id, beacon_intervals in intervals.items()}
+        return self.union(interval for beacon_intervals in intervals.values() for interval in beacon_intervals), dwell
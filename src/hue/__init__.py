@@ -1,11 +1,16 @@
 from ._bridge import Bridge, BridgeManager
 from ._client import BridgeClientSession
+from ._discovery import BridgeDiscovery
 from ._exceptions import *
+from ._pairing import PairingManager, PairingStatus
 
 __all__ = [
     "BridgeClientSession",
     "Bridge",
     "BridgeManager",
+    "BridgeDiscovery",
+    "PairingManager",
+    "PairingStatus",
     "BridgeError",
     "UnauthorizedUserError",
     "ResourceUnavailable",
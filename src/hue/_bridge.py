@@ -1,12 +1,10 @@
 import asyncio
-import ipaddress
 import logging
-from typing import Optional
-
-from zeroconf import Zeroconf, ServiceStateChange
-from zeroconf.asyncio import AsyncZeroconf, AsyncServiceBrowser, AsyncServiceInfo
+from typing import Mapping, Optional
 
+import tracing
 from ._client import BridgeClient, BridgeClientSession
+from ._discovery import BridgeDiscovery
 
 
 class Bridge:
@@ -21,10 +19,11 @@ class Bridge:
         self.__name = None
         self.group_ids = set()
 
-        self.__client = BridgeClient(session, username=username)
+        self.__client = BridgeClient(session, username=username, bridge_id=bridge_id)
 
     async def __clean_groups(self):
-        available_groups = await self.available_groups
+        # A failed request must not be taken for a bridge without groups.
+        available_groups = await self.__client.get_groups()
         self.group_ids = self.group_ids.intersection(available_groups.keys())
 
     @property
@@ -35,10 +34,16 @@ class Bridge:
     def connected(self):
         return self.__client.ip and self.__client.username
 
+    # Credentials survive a lost address, reconnecting does not need the link button.
+    @property
+    def paired(self) -> bool:
+        return bool(self.__client.username)
+
+    # The name is fetched once, page views do not wait on the bridge for it.
     @property
     async def name(self) -> str:
         try:
-            if self.__client.ip:
+            if self.__client.ip and self.__name is None:
                 config = await self.__client.get_public_config()
                 self.__name = config['name']
         except Exception:
@@ -54,7 +59,7 @@ class Bridge:
         except Exception:
             return {}
 
-    async def connect(self, ip: str = None, username: str = None):
+    async def connect(self, ip: str = None, username: str = None, verify: bool = True):
         if ip:
             self.__client.ip = ip
         if username:
@@ -72,17 +77,19 @@ class Bridge:
                 raise RuntimeError(e)
 
         # Verify API credentials
-        await self.__client.get_config()
+        if verify:
+            await self.__client.get_config()
 
     async def set_groups_on(self, value: bool):
         if not self.connected:
             raise RuntimeError("Not connected")
-        await self.__clean_groups()
+        with tracing.span('set_groups_on', bridge=self.__id):
+            await self.__clean_groups()
 
-        tasks = []
-        for group_id in self.group_ids:
-            tasks.append(asyncio.ensure_future(self.__client.set_group_on(group_id, value)))
-        await asyncio.gather(*tasks)
+            tasks = []
+            for group_id in self.group_ids:
+                tasks.append(asyncio.ensure_future(self.__client.set_group_on(group_id, value)))
+            await asyncio.gather(*tasks)
 
     def __eq__(self, other):
         return isinstance(other, Bridge) and other.id == self.id
@@ -107,72 +114,30 @@ class Bridge:
 
 
 class BridgeManager:
-    __BRIDGE_SERVICE = '_hue._tcp.local.'
     __logger: logging.Logger
     __session: BridgeClientSession
-    __hue_service_records: dict[str, AsyncServiceInfo]
-    __hue_service_records_updating: bool
-    __available_bridge_ips: dict[str, str]
-    __zeroconf: Optional[AsyncZeroconf]
-    __service_browser: Optional[AsyncServiceBrowser]
+    __static_bridge_ips: Optional[dict[str, str]]
+    __discovery: Optional[BridgeDiscovery]
+    __bridge_names: dict[str, str]
+    __name_lookups: set[str]
 
     bridges: dict[str, Bridge]
 
-    def __init__(self):
+    def __init__(self, session: BridgeClientSession = None, bridge_ips: dict[str, str] = None,
+                 discovery: BridgeDiscovery = None):
         self.__logger = logging.getLogger(__name__)
-        self.__session = BridgeClientSession()
-        self.__hue_service_records = {}
-        self.__hue_service_records_updating = False
-        self.__available_bridge_ips = {}
-        # Instantiate zeroconfig later to make sure it uses the same asyncio loop as the rest.
-        self.__zeroconf = None
-        self.__service_browser = None
+        self.__session = session or BridgeClientSession()
+        # Bridges with a known address are not discovered through zeroconf.
+        self.__static_bridge_ips = dict(bridge_ips) if bridge_ips is not None else None
+        self.__discovery = None if bridge_ips is not None else discovery or BridgeDiscovery()
+        self.__bridge_names = {}
+        self.__name_lookups = set()
 
         self.bridges = {}
 
-    def __handle_service_event(self, zeroconf: Zeroconf, service_type: str, name: str,
-                               state_change: ServiceStateChange) -> None:
-        if state_change is ServiceStateChange.Removed:
-            del self.__hue_service_records[name]
-            self.__logger.info("Bridge service '%s' removed", name)
-        elif state_change is ServiceStateChange.Added:
-            self.__hue_service_records[name] = AsyncServiceInfo(service_type, name)
-            self.__logger.info("Bridge service '%s' added", name)
-        else:
-            self.__logger.debug("Bridge service '%s' updated", name)
-
-        self.__update_bridge_records()
-
-    def __update_bridge_records(self, clear_cache: bool = False):
-        if self.__hue_service_records_updating:
-            return
-        self.__hue_service_records_updating = True
-
-        async def process():
-            if clear_cache:
-                self.__zeroconf.zeroconf.cache.cache.clear()
-                self.__zeroconf.zeroconf.cache.service_cache.clear()
-                self.__logger.debug("Zeroconf cache cleared")
-
-            self.__available_bridge_ips.clear()
-            for name, service_info in list(self.__hue_service_records.items()):
-                if clear_cache:
-                    service_info.text = None
-                if not await service_info.async_request(self.__zeroconf.zeroconf, 1000):
-                    del self.__hue_service_records[name]
-                    self.__logger.info("Bridge service '%s' removed", name)
-                    continue
-
-                try:
-                    bridge_id = service_info.properties[b'bridgeid'].decode('utf-8')
-                    bridge_ip = str(ipaddress.ip_address(service_info.addresses[0]))
-                    self.__available_bridge_ips[bridge_id] = bridge_ip
-                except Exception as e:
-                    self.__logger.error(e if e.args else type(e))
-
-            self.__hue_service_records_updating = False
-
-        asyncio.ensure_future(process())
+    @property
+    def __bridge_ips(self) -> Mapping[str, str]:
+        return self.__discovery.bridge_ips if self.__discovery else self.__static_bridge_ips
 
     @property
     def session(self) -> BridgeClientSession:
@@ -182,31 +147,57 @@ class BridgeManager:
     async def available_bridges(self) -> dict[str, str]:
         bridges = {}
         update_bridge_records = False
-        for bridge_id, bridge_ip in self.__available_bridge_ips.items():
+        for bridge_id, bridge_ip in list(self.__bridge_ips.items()):
             try:
-                config = await BridgeClient(self.__session, bridge_ip).get_public_config()
-                bridges[bridge_id] = config['name']
+                config = await BridgeClient(self.__session, bridge_ip, bridge_id=bridge_id).get_public_config()
+                bridges[bridge_id] = self.__bridge_names[bridge_id] = config['name']
             except ConnectionError:
                 update_bridge_records = True
             except Exception as e:
                 self.__logger.error(e if e.args else type(e))
 
-        if update_bridge_records:
-            self.__update_bridge_records(clear_cache=True)
+        if update_bridge_records and self.__discovery:
+            self.__discovery.refresh(clear_cache=True)
+
+        return bridges
 
+    # Discovered bridges without probing them, names are looked up once in the background.
+    @property
+    def known_bridges(self) -> dict[str, Optional[str]]:
+        bridges = {}
+        for bridge_id, bridge_ip in list(self.__bridge_ips.items()):
+            if bridge_id not in self.__bridge_names and bridge_id not in self.__name_lookups:
+                self.__name_lookups.add(bridge_id)
+                asyncio.ensure_future(self.__look_up_name(bridge_id, bridge_ip))
+            bridges[bridge_id] = self.__bridge_names.get(bridge_id)
         return bridges
 
+    async def __look_up_name(self, bridge_id: str, bridge_ip: str):
+        try:
+            config = await BridgeClient(self.__session, bridge_ip, bridge_id=bridge_id).get_public_config()
+            self.__bridge_names[bridge_id] = config['name']
+        except Exception as e:
+            self.__logger.debug(e if e.args else type(e))
+        finally:
+            self.__name_lookups.discard(bridge_id)
+
     def get_bridge_ip(self, bridge_id: str) -> str:
-        return self.__available_bridge_ips[bridge_id]
+        return self.__bridge_ips[bridge_id]
+
+    def add_discovery_listener(self, listener: callable):
+        if self.__discovery:
+            self.__discovery.add_listener(listener)
+
+    def remove_discovery_listener(self, listener: callable):
+        if self.__discovery:
+            self.__discovery.remove_listener(listener)
 
     def start(self):
         self.__session.create()
-        self.__zeroconf = AsyncZeroconf()
-        self.__service_browser = AsyncServiceBrowser(self.__zeroconf.zeroconf,
-                                                     self.__BRIDGE_SERVICE,
-                                                     handlers=[self.__handle_service_event])
+        if self.__discovery:
+            self.__discovery.start()
 
     async def stop(self):
-        await self.__service_browser.async_cancel()
-        await self.__zeroconf.async_close()
+        if self.__discovery:
+            await self.__discovery.stop()
         await self.__session.close()
@@ -1,16 +1,32 @@
 import asyncio
+import time
 from typing import Optional
 
 import aiohttp
 
+import metrics
+import tracing
 from ._exceptions import *
 
 
+class Metrics:
+    REQUEST_DURATION = metrics.Histogram('elessar_hue_request_duration_seconds', "Duration of Hue bridge requests.",
+                                         ('bridge', 'method', 'endpoint'),
+                                         buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5))
+    REQUEST_ERRORS = metrics.Counter('elessar_hue_request_errors_total', "Failed Hue bridge requests.",
+                                     ('bridge', 'method', 'endpoint', 'error'))
+
+
 class BridgeClientSession:
     __session: Optional[aiohttp.ClientSession]
+    __users: int
 
-    def __init__(self):
+    scheme: str
+
+    def __init__(self, scheme: str = 'https'):
         self.__session = None
+        self.__users = 0
+        self.scheme = scheme
 
     @property
     def session(self):
@@ -19,25 +35,46 @@ class BridgeClientSession:
 
         return self.__session
 
+    # The session, and its connection pool, is shared by every bridge manager that created it.
     def create(self):
-        self.__session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=1))
+        self.__users += 1
+        if not self.__session:
+            self.__session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=1))
 
     async def close(self):
-        await self.__session.close()
+        self.__users -= 1
+        if self.__users <= 0 and self.__session:
+            await self.__session.close()
+            self.__session = None
 
 
 class BridgeClient:
     __session: BridgeClientSession
+    bridge_id: Optional[str]
     ip: Optional[str]
     username: Optional[str]
 
-    def __init__(self, session: BridgeClientSession, ip: str = None, username: str = None):
+    def __init__(self, session: BridgeClientSession, ip: str = None, username: str = None, bridge_id: str = None):
         self.__session = session
+        self.bridge_id = bridge_id
         self.ip = ip
         self.username = username
 
     async def request(self, method: str, endpoint: str, endpoint_args: list[str] = None, public: bool = False,
                       data=None):
+        labels = (self.bridge_id or self.ip or '', method, endpoint or '/')
+        start = time.perf_counter()
+        try:
+            with tracing.span('request', bridge=labels[0], method=method, endpoint=labels[2]):
+                return await self.__request(method, endpoint, endpoint_args, public, data)
+        except Exception as e:
+            Metrics.REQUEST_ERRORS.labels(*labels, type(e).__name__).inc()
+            raise e
+        finally:
+            Metrics.REQUEST_DURATION.labels(*labels).observe(time.perf_counter() - start)
+
+    async def __request(self, method: str, endpoint: str, endpoint_args: list[str] = None, public: bool = False,
+                        data=None):
         if endpoint_args is None:
             endpoint_args = []
         if not self.ip:
@@ -45,7 +82,8 @@ class BridgeClient:
         if not public and not self.username:
             raise ClientError("Private endpoint needs username")
 
-        url = 'https://{}/api{}{}'.format(
+        url = '{}://{}/api{}{}'.format(
+            self.__session.scheme,
             self.ip,
             '' if public else '/' + self.username,
             endpoint.format(*endpoint_args)
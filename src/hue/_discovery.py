@@ -0,0 +1,118 @@
+import asyncio
+import ipaddress
+import logging
+import time
+import types
+from typing import Optional
+
+from zeroconf import Zeroconf, ServiceStateChange
+from zeroconf.asyncio import AsyncZeroconf, AsyncServiceBrowser, AsyncServiceInfo
+
+import metrics
+
+
+class Metrics:
+    ZEROCONF_REFRESH_DURATION = metrics.Histogram('elessar_hue_zeroconf_refresh_duration_seconds',
+                                                  "Duration of bridge service records refreshes.",
+                                                  buckets=(.01, .05, .1, .25, .5, 1, 2.5, 5, 10))
+
+
+class BridgeDiscovery:
+    __BRIDGE_SERVICE = '_hue._tcp.local.'
+    __logger: logging.Logger
+    __hue_service_records: dict[str, AsyncServiceInfo]
+    __hue_service_records_updating: bool
+    __bridge_ips: dict[str, str]
+    __users: int
+    __listeners: set[callable]
+    __zeroconf: Optional[AsyncZeroconf]
+    __service_browser: Optional[AsyncServiceBrowser]
+
+    def __init__(self):
+        self.__logger = logging.getLogger(__name__)
+        self.__hue_service_records = {}
+        self.__hue_service_records_updating = False
+        self.__bridge_ips = {}
+        self.__users = 0
+        self.__listeners = set()
+        # Instantiate zeroconfig later to make sure it uses the same asyncio loop as the rest.
+        self.__zeroconf = None
+        self.__service_browser = None
+
+    def __handle_service_event(self, zeroconf: Zeroconf, service_type: str, name: str,
+                               state_change: ServiceStateChange) -> None:
+        if state_change is ServiceStateChange.Removed:
+            del self.__hue_service_records[name]
+            self.__logger.info("Bridge service '%s' removed", name)
+        elif state_change is ServiceStateChange.Added:
+            self.__hue_service_records[name] = AsyncServiceInfo(service_type, name)
+            self.__logger.info("Bridge service '%s' added", name)
+        else:
+            self.__logger.debug("Bridge service '%s' updated", name)
+
+        self.refresh()
+
+    def refresh(self, clear_cache: bool = False):
+        if not self.__zeroconf or self.__hue_service_records_updating:
+            return
+        self.__hue_service_records_updating = True
+
+        async def process():
+            start = time.perf_counter()
+            if clear_cache:
+                self.__zeroconf.zeroconf.cache.cache.clear()
+                self.__zeroconf.zeroconf.cache.service_cache.clear()
+                self.__logger.debug("Zeroconf cache cleared")
+
+            self.__bridge_ips.clear()
+            for name, service_info in list(self.__hue_service_records.items()):
+                if clear_cache:
+                    service_info.text = None
+                if not await service_info.async_request(self.__zeroconf.zeroconf, 1000):
+                    del self.__hue_service_records[name]
+                    self.__logger.info("Bridge service '%s' removed", name)
+                    continue
+
+                try:
+                    bridge_id = service_info.properties[b'bridgeid'].decode('utf-8')
+                    bridge_ip = str(ipaddress.ip_address(service_info.addresses[0]))
+                    self.__bridge_ips[bridge_id] = bridge_ip
+                except Exception as e:
+                    self.__logger.error(e if e.args else type(e))
+
+            self.__hue_service_records_updating = False
+            Metrics.ZEROCONF_REFRESH_DURATION.observe(time.perf_counter() - start)
+            for listener in list(self.__listeners):
+                listener()
+
+        asyncio.ensure_future(process())
+
+    @property
+    def bridge_ips(self) -> types.MappingProxyType[str, str]:
+        return types.MappingProxyType(self.__bridge_ips)
+
+    # Listeners are called once the bridge addresses are refreshed.
+    def add_listener(self, listener: callable):
+        self.__listeners.add(listener)
+
+    def remove_listener(self, listener: callable):
+        self.__listeners.discard(listener)
+
+    # A single mDNS browser is shared by every bridge manager that started it.
+    def start(self):
+        self.__users += 1
+        if self.__zeroconf:
+            return
+        self.__zeroconf = AsyncZeroconf()
+        self.__service_browser = AsyncServiceBrowser(self.__zeroconf.zeroconf,
+                                                     self.__BRIDGE_SERVICE,
+                                                     handlers=[self.__handle_service_event])
+
+    async def stop(self):
+        self.__users -= 1
+        if self.__users > 0 or not self.__zeroconf:
+            return
+        await self.__service_browser.async_cancel()
+        await self.__zeroconf.async_close()
+        self.__zeroconf = None
+        self.__service_browser = None
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+from typing import Optional
+
+from ._bridge import Bridge, BridgeManager
+from ._exceptions import ButtonNotPressedError
+
+
+class PairingStatus:
+    PAIRED = 'paired'
+    UNAVAILABLE = 'unavailable'
+    WAITING = 'waiting'
+    PAIRING = 'pairing'
+    FAILED = 'failed'
+
+
+class Common:
+    SUPERVISION_INTERVAL = 5
+    # Failed attempts are backed off, discovery and the Pair button wake the task up.
+    BACKOFF_MIN = 5
+    BACKOFF_MAX = 300
+    # The link button of a bridge stays active for 30 seconds once pressed.
+    BURST_DURATION = 30
+    BURST_INTERVAL = 1
+
+
+class PairingState:
+    __wakeup: asyncio.Event
+
+    status: str
+    error: Optional[str]
+    burst_until: float
+
+    def __init__(self):
+        self.__wakeup = asyncio.Event()
+        self.status = PairingStatus.UNAVAILABLE
+        self.error = None
+        self.burst_until = 0
+
+    def wake_up(self):
+        self.__wakeup.set()
+
+    async def wait(self, delay: float):
+        try:
+            await asyncio.wait_for(self.__wakeup.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+        self.__wakeup.clear()
+
+
+class PairingManager:
+    __logger: logging.Logger
+    __bridge_manager: BridgeManager
+    __states: dict[str, PairingState]
+    __tasks: dict[str, asyncio.Task]
+    __supervisor: Optional[asyncio.Task]
+    __paired_callback: Optional[callable]
+
+    def __init__(self, bridge_manager: BridgeManager, paired_callback: callable = None):
+        self.__logger = logging.getLogger(__name__)
+        self.__bridge_manager = bridge_manager
+        # Called with the bridge once new credentials are obtained, so they can be saved.
+        self.__paired_callback = paired_callback
+        self.__states = {}
+        self.__tasks = {}
+        self.__supervisor = None
+
+    def __bursting(self, state: PairingState) -> bool:
+        return asyncio.get_running_loop().time() < state.burst_until
+
+    async def __pair(self, bridge: Bridge, state: PairingState):
+        delay = Common.BACKOFF_MIN
+        while not bridge.connected and self.__bridge_manager.bridges.get(bridge.id) is bridge:
+            paired = bridge.paired
+            try:
+                await bridge.connect(self.__bridge_manager.get_bridge_ip(bridge.id))
+                state.status = PairingStatus.PAIRED
+                state.error = None
+                self.__logger.info("Bridge '%s' %s", bridge.id, "reconnected" if paired else "paired")
+                if not paired and self.__paired_callback:
+                    self.__paired_callback(bridge)
+                break
+            except (KeyError, ConnectionError):
+                state.status = PairingStatus.UNAVAILABLE
+            except ButtonNotPressedError:
+                state.status = PairingStatus.PAIRING if self.__bursting(state) else PairingStatus.WAITING
+            except Exception as e:
+                state.status = PairingStatus.FAILED
+                state.error = str(e) if e.args else type(e).__name__
+                self.__logger.warning(e if e.args else type(e))
+
+            # Only pairing needs the burst, while the link button is active.
+            if self.__bursting(state) and not bridge.paired:
+                await state.wait(Common.BURST_INTERVAL)
+                delay = Common.BACKOFF_MIN
+            else:
+                await state.wait(delay)
+                delay = min(delay * 2, Common.BACKOFF_MAX)
+
+    def __spawn(self, bridge: Bridge):
+        task = self.__tasks.get(bridge.id)
+        if task and not task.done():
+            return
+        state = self.__states.setdefault(bridge.id, PairingState())
+        self.__tasks[bridge.id] = asyncio.ensure_future(self.__pair(bridge, state))
+
+    def __bridges_discovered(self):
+        for bridge_id, state in self.__states.items():
+            bridge = self.__bridge_manager.bridges.get(bridge_id)
+            if bridge and not bridge.connected and state.status == PairingStatus.UNAVAILABLE:
+                state.wake_up()
+
+    async def __supervise(self):
+        while True:
+            for bridge_id in set(self.__states).difference(self.__bridge_manager.bridges):
+                del self.__states[bridge_id]
+            for bridge in list(self.__bridge_manager.bridges.values()):
+                if bridge.connected:
+                    self.__states.setdefault(bridge.id, PairingState()).status = PairingStatus.PAIRED
+                else:
+                    self.__spawn(bridge)
+            await asyncio.sleep(Common.SUPERVISION_INTERVAL)
+
+    def status(self, bridge_id: str) -> Optional[str]:
+        state = self.__states.get(bridge_id)
+        return state.status if state else None
+
+    def pair(self, bridge_id: str):
+        bridge = self.__bridge_manager.bridges.get(bridge_id)
+        if not bridge or bridge.connected:
+            return
+        self.__spawn(bridge)
+        state = self.__states[bridge_id]
+        state.burst_until = asyncio.get_running_loop().time() + Common.BURST_DURATION
+        state.status = PairingStatus.PAIRING
+        state.wake_up()
+
+    def start(self):
+        self.__bridge_manager.add_discovery_listener(self.__bridges_discovered)
+        self.__supervisor = asyncio.ensure_future(self.__supervise())
+
+    async def stop(self):
+        self.__bridge_manager.remove_discovery_listener(self.__bridges_discovered)
+        tasks = list(self.__tasks.values())
+        if self.__supervisor:
+            tasks.append(self.__supervisor)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.__tasks = {}
+        self.__supervisor = None
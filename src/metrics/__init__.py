@@ -0,0 +1,15 @@
+from ._metrics import Counter, CounterChild, Gauge, GaugeChild, Histogram, HistogramChild, Registry, REGISTRY, Common
+
+CONTENT_TYPE = Common.CONTENT_TYPE
+
+__all__ = [
+    "Counter",
+    "CounterChild",
+    "Gauge",
+    "GaugeChild",
+    "Histogram",
+    "HistogramChild",
+    "Registry",
+    "REGISTRY",
+    "CONTENT_TYPE"
+]
@@ -0,0 +1,197 @@
+import abc
+import bisect
+import math
+from typing import Iterator, Optional
+
+
+class Common:
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+    DEFAULT_BUCKETS = (.0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+# Metrics are only updated from the event loop thread: children are plain objects updated in place, without locks.
+class CounterChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class GaugeChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+
+class HistogramChild:
+    __slots__ = ('upper_bounds', 'counts', 'sum')
+
+    def __init__(self, upper_bounds: tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+
+
+class Metric(abc.ABC):
+    __name: str
+    __documentation: str
+    __label_names: tuple[str, ...]
+    __children: dict[tuple[str, ...], any]
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = (),
+                 registry: Optional['Registry'] = None):
+        self.__name = name
+        self.__documentation = documentation
+        self.__label_names = tuple(label_names)
+        self.__children = {}
+        if not self.__label_names:
+            # Unlabeled metrics are exposed from the start.
+            self.labels()
+        (registry or REGISTRY).register(self)
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @classmethod
+    @abc.abstractmethod
+    def type(cls) -> str:
+        pass
+
+    @abc.abstractmethod
+    def _create_child(self):
+        pass
+
+    @abc.abstractmethod
+    def _expose_child(self, labels: str, child) -> Iterator[str]:
+        pass
+
+    def labels(self, *values: str):
+        if len(values) != len(self.__label_names):
+            raise ValueError(f"Metric '{self.__name}' expects labels {self.__label_names}")
+        child = self.__children.get(values)
+        if child is None:
+            child = self.__children[values] = self._create_child()
+        return child
+
+    def expose(self) -> Iterator[str]:
+        yield f"# HELP {self.__name} {self.__documentation}"
+        yield f"# TYPE {self.__name} {self.type()}"
+        for values, child in list(self.__children.items()):
+            yield from self._expose_child(_format_labels(self.__label_names, values), child)
+
+
+class Counter(Metric):
+    @classmethod
+    def type(cls) -> str:
+        return 'counter'
+
+    def _create_child(self) -> CounterChild:
+        return CounterChild()
+
+    def _expose_child(self, labels: str, child: CounterChild) -> Iterator[str]:
+        yield f"{self.name}{labels} {_format_value(child.value)}"
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    @classmethod
+    def type(cls) -> str:
+        return 'gauge'
+
+    def _create_child(self) -> GaugeChild:
+        return GaugeChild()
+
+    def _expose_child(self, labels: str, child: GaugeChild) -> Iterator[str]:
+        yield f"{self.name}{labels} {_format_value(child.value)}"
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+
+class Histogram(Metric):
+    __upper_bounds: tuple[float, ...]
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = Common.DEFAULT_BUCKETS, registry: Optional['Registry'] = None):
+        self.__upper_bounds = tuple(sorted(bucket for bucket in buckets if bucket != math.inf))
+        super().__init__(name, documentation, label_names, registry)
+
+    @classmethod
+    def type(cls) -> str:
+        return 'histogram'
+
+    def _create_child(self) -> HistogramChild:
+        return HistogramChild(self.__upper_bounds)
+
+    def _expose_child(self, labels: str, child: HistogramChild) -> Iterator[str]:
+        prefix = labels[1:-1] + ',' if labels else ''
+        cumulative = 0
+        for upper_bound, count in zip(self.__upper_bounds + (math.inf,), child.counts):
+            cumulative += count
+            yield f'{self.name}_bucket{{{prefix}le="{_format_value(upper_bound)}"}} {cumulative}'
+        yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+        yield f"{self.name}_count{labels} {cumulative}"
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+
+class Registry:
+    __metrics: dict[str, Metric]
+
+    def __init__(self):
+        self.__metrics = {}
+
+    def register(self, metric: Metric):
+        if metric.name in self.__metrics:
+            raise ValueError(f"Metric '{metric.name}' already registered")
+        self.__metrics[metric.name] = metric
+
+    def expose(self) -> str:
+        lines = []
+        for metric in self.__metrics.values():
+            lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
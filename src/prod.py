@@ -1,4 +1,5 @@
 import asyncio
+import os
 import sys
 from logging.config import dictConfig
 
@@ -17,8 +18,29 @@ if __name__ == '__main__':
             'hue': {
                 'level': 'INFO',
             },
+            'tracing': {
+                'level': 'INFO',
+            },
+            'history': {
+                'level': 'INFO',
+            },
         },
     })
     config = Config()
     config.bind = '0.0.0.0:80'
-    asyncio.run(serve(elessar.Elessar(sys.argv[1]), config))
+    scan_process = os.environ.get('ELESSAR_SCAN_PROCESS') == '1'
+    # Sightings of the configured beacons are kept in this directory to query occupancy.
+    history_path = os.environ.get('ELESSAR_HISTORY')
+    if os.path.isdir(sys.argv[1]):
+        # Every configuration file of the directory is a site, served under /sites/<file name>.
+        app = elessar.Elessar()
+        for file_name in sorted(os.listdir(sys.argv[1])):
+            site_name, extension = os.path.splitext(file_name)
+            if extension == '.json':
+                app.add_site(site_name, os.path.join(sys.argv[1], file_name), scan_process=scan_process,
+                             history_path=os.path.join(history_path, site_name) if history_path else None)
+    else:
+        # An optional second argument records every advertisement to a capture file for later replay.
+        app = elessar.Elessar(sys.argv[1], capture_path=sys.argv[2] if len(sys.argv) > 2 else None,
+                              scan_process=scan_process, history_path=history_path)
+    asyncio.run(serve(app, config))
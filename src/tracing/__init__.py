@@ -0,0 +1,11 @@
+from ._tracing import Span, Trace, Tracer, current, trace, span, mark
+
+__all__ = [
+    "Span",
+    "Trace",
+    "Tracer",
+    "current",
+    "trace",
+    "span",
+    "mark"
+]
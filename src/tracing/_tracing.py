@@ -0,0 +1,159 @@
+import collections
+import contextlib
+import contextvars
+import datetime
+import itertools
+import json
+import logging
+import time
+from typing import Iterator, Optional
+
+
+class Span:
+    __slots__ = ('name', 'start', 'end', 'attributes')
+
+    name: str
+    start: float
+    end: Optional[float]
+    attributes: dict[str, any]
+
+    def __init__(self, name: str, start: float, end: float = None, attributes: dict[str, any] = None):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.attributes = attributes or {}
+
+
+class Trace:
+    __ids = itertools.count(1)
+
+    __id: int
+    __name: str
+    __started_at: float
+    __start: float
+    __end: Optional[float]
+    __spans: list[Span]
+
+    attributes: dict[str, any]
+
+    def __init__(self, name: str, **attributes):
+        self.__id = next(Trace.__ids)
+        self.__name = name
+        self.__started_at = time.time()
+        self.__start = time.perf_counter()
+        self.__end = None
+        self.__spans = []
+        self.attributes = attributes
+
+    @property
+    def id(self) -> int:
+        return self.__id
+
+    @property
+    def finished(self) -> bool:
+        return self.__end is not None
+
+    def __origin(self) -> float:
+        # Spans may start before the trace was created, e.g. the scan cycle the sighting happened in.
+        return min([self.__start] + [span.start for span in self.__spans])
+
+    @property
+    def duration(self) -> float:
+        return (self.__end or time.perf_counter()) - self.__origin()
+
+    def add_span(self, name: str, start: float, end: float = None, **attributes) -> Span:
+        span = Span(name, start, end, attributes)
+        self.__spans.append(span)
+        return span
+
+    def mark(self, name: str, **attributes):
+        now = time.perf_counter()
+        self.add_span(name, now, now, **attributes)
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        span = self.add_span(name, time.perf_counter(), **attributes)
+        try:
+            yield span
+        except Exception as e:
+            span.attributes['error'] = type(e).__name__
+            raise e
+        finally:
+            span.end = time.perf_counter()
+
+    def finish(self):
+        if self.__end is None:
+            self.__end = time.perf_counter()
+
+    def to_record(self) -> dict[str, any]:
+        origin = self.__origin()
+        return {
+            'id': self.__id,
+            'name': self.__name,
+            'started_at': datetime.datetime.fromtimestamp(self.__started_at - (self.__start - origin)).isoformat(),
+            'duration_ms': round(self.duration * 1000, 3),
+            'attributes': dict(self.attributes),
+            'spans': [{
+                'name': span.name,
+                'start_ms': round((span.start - origin) * 1000, 3),
+                'duration_ms': None if span.end is None else round((span.end - span.start) * 1000, 3),
+                **span.attributes
+            } for span in sorted(self.__spans, key=lambda span: span.start)]
+        }
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar('trace', default=None)
+
+
+def current() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextlib.contextmanager
+def trace(name: str, **attributes) -> Iterator[Trace]:
+    # Tasks created inside the block, e.g. with asyncio.ensure_future, inherit the trace.
+    new_trace = Trace(name, **attributes)
+    token = _current_trace.set(new_trace)
+    try:
+        yield new_trace
+    finally:
+        _current_trace.reset(token)
+
+
+def span(name: str, **attributes):
+    current_trace = _current_trace.get()
+    if current_trace is None:
+        return contextlib.nullcontext()
+    return current_trace.span(name, **attributes)
+
+
+def mark(name: str, **attributes):
+    current_trace = _current_trace.get()
+    if current_trace is not None:
+        current_trace.mark(name, **attributes)
+
+
+class Tracer:
+    __logger: logging.Logger
+    __traces: collections.deque[Trace]
+
+    slow_threshold: float
+
+    def __init__(self, size: int = 50, slow_threshold: float = 5.0):
+        self.__logger = logging.getLogger(__name__)
+        self.__traces = collections.deque(maxlen=size)
+        self.slow_threshold = slow_threshold
+
+    @property
+    def traces(self) -> list[Trace]:
+        return list(reversed(self.__traces))
+
+    def finish(self, finished_trace: Trace):
+        finished_trace.finish()
+        self.__traces.append(finished_trace)
+        if finished_trace.duration >= self.slow_threshold:
+            self.__logger.info(json.dumps(finished_trace.to_record()))
+
+    def records(self, slow: bool = False) -> list[dict[str, any]]:
+        return [recorded_trace.to_record() for recorded_trace in self.traces
+                if not slow or recorded_trace.duration >= self.slow_threshold]